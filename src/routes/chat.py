@@ -4,17 +4,56 @@ Rotas para o chat de IA para consulta de dados.
 
 from flask import Blueprint, request, jsonify, current_app
 import json
+import hashlib
+import orjson
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+try:
+    import pyarrow as pa
+except ImportError:  # Sem pyarrow, a amostra é servida apenas em JSON
+    pa = None
 
 # Criar blueprint
 chat_bp = Blueprint('chat', __name__)
 
+# Tipo de conteúdo do formato de streaming do Arrow IPC
+ARROW_STREAM_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Opções do orjson: arrays/escalares NumPy e chaves não-string (nomes de coluna numéricos)
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Tempo máximo de espera pela resposta do despachante (segundos)
+CHAT_TIMEOUT = 120
+
+def _sample_to_arrow(sample):
+    """
+    Serializa a amostra no formato de streaming do Arrow IPC.
+    
+    Args:
+        sample (pandas.DataFrame): Amostra dos dados
+        
+    Returns:
+        bytes: Conteúdo do stream ou None se alguma coluna não puder ser convertida
+            (colunas de objetos com tipos misturados, comuns em planilhas)
+    """
+    try:
+        table = pa.Table.from_pandas(sample, preserve_index=False)
+    except pa.ArrowException:
+        return None
+    
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    
+    return sink.getvalue().to_pybytes()
+
 @chat_bp.route('/api/chat', methods=['POST'])
 def process_chat():
     """
     Endpoint para processar perguntas do chat.
     """
     # Verificar se há dados na requisição
-    if not request.json or 'message' not in request.json:
+    if not isinstance(request.json, dict) or 'message' not in request.json:
         return jsonify({
             'success': False,
             'error': 'Mensagem não fornecida'
@@ -22,18 +61,36 @@ def process_chat():
     
     message = request.json['message']
     
+    if not isinstance(message, str) or not message.strip():
+        return jsonify({
+            'success': False,
+            'error': 'Mensagem inválida'
+        }), 400
+    
     try:
-        # Obter o motor de chat
-        chat_engine = current_app.config['CHAT_ENGINE']
+        # Obter o despachante do chat
+        dispatcher = current_app.config['CHAT_DISPATCHER']
         
-        # Processar a pergunta
-        response = chat_engine.process_query(message)
+        # Processar a pergunta em lote com as demais requisições concorrentes
+        future = dispatcher.submit(message)
+        try:
+            response = future.result(timeout=CHAT_TIMEOUT)
+        except FutureTimeoutError:
+            # Se a pergunta ainda não começou a ser processada, não vai mais ao LLM
+            future.cancel()
+            return jsonify({
+                'success': False,
+                'error': 'Tempo esgotado ao processar a pergunta'
+            }), 504
         
-        return jsonify({
+        # Serializar com orjson (em C) em vez do json da biblioteca padrão usado pelo jsonify
+        body = orjson.dumps({
             'success': True,
             'answer': response['answer'],
             'data': response['data']
-        }), 200
+        }, default=str, option=ORJSON_OPTIONS)
+        
+        return current_app.response_class(body, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({
@@ -69,22 +126,26 @@ def get_data_summary():
         # Obter o processador de dados
         data_processor = current_app.config['DATA_PROCESSOR']
         
-        # Verificar se há dados carregados
-        if data_processor.data is None:
-            return jsonify({
-                'success': False,
-                'error': 'Nenhum dado carregado'
-            }), 404
+        # Obter metadados e estatísticas (já serializadas e em cache) sob a trava de
+        # leitura, para que um upload simultâneo não misture dados de duas cargas
+        with data_processor.lock.read():
+            # Verificar se há dados carregados
+            if data_processor.data is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Nenhum dado carregado'
+                }), 404
+            
+            metadata = orjson.dumps(data_processor.get_metadata(), default=str, option=ORJSON_OPTIONS)
+            summary_stats = data_processor.get_summary_json()
         
-        # Obter metadados e estatísticas
-        metadata = data_processor.get_metadata()
-        summary_stats = data_processor.get_summary_stats()
+        body = b'{"success":true,"metadata":' + metadata + b',"summary":' + summary_stats + b'}'
         
-        return jsonify({
-            'success': True,
-            'metadata': metadata,
-            'summary': summary_stats
-        }), 200
+        response = current_app.response_class(body, status=200, mimetype='application/json')
+        response.set_etag(hashlib.blake2b(body).hexdigest()[:16])
+        
+        # Responde 304 se o cliente já tem esta versão
+        return response.make_conditional(request)
         
     except Exception as e:
         return jsonify({
@@ -118,11 +179,22 @@ def get_data_sample():
         # Obter amostra
         sample = data_processor.get_data_sample(sample_size)
         
-        return jsonify({
-            'success': True,
-            'sample': sample.to_dict(orient='records'),
-            'columns': sample.columns.tolist()
-        }), 200
+        # Clientes que aceitam Arrow recebem a amostra em formato colunar, sem JSON
+        if pa is not None and ARROW_STREAM_MIMETYPE in request.headers.get('Accept', ''):
+            body = _sample_to_arrow(sample)
+            if body is not None:
+                return current_app.response_class(body, status=200, mimetype=ARROW_STREAM_MIMETYPE)
+        
+        # Serializar direto para JSON com o pandas, sem montar dicts Python por linha
+        # (NaN/Infinity viram null); 15 dígitos é a precisão máxima do writer do pandas
+        payload = sample.to_json(orient='records', date_format='iso', double_precision=15, force_ascii=False)
+        columns = json.dumps([str(col) for col in sample.columns])
+        
+        return current_app.response_class(
+            f'{{"success":true,"sample":{payload},"columns":{columns}}}',
+            status=200,
+            mimetype='application/json'
+        )
         
     except Exception as e:
         return jsonify({
@@ -4,17 +4,85 @@ Rotas para geração de relatórios em PDF e Excel.
 
 from flask import Blueprint, request, jsonify, current_app, send_file
 import os
+import time
 import uuid
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from datetime import datetime
 
 # Criar blueprint
 reports_bp = Blueprint('reports', __name__)
 
 # Configurações de relatórios
-REPORTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
+REPORTS_DIR = Path(__file__).resolve().parent.parent / 'reports'
+
+# Relatórios nunca são regravados com o mesmo nome; o navegador pode reaproveitá-los (segundos)
+REPORT_MAX_AGE = 3600
+
+# Prefixo da location interna do Nginx que serve REPORTS_DIR (ex.: '/internal-reports/').
+# Quando definido, os downloads são entregues pelo Nginx via X-Accel-Redirect.
+REPORTS_ACCEL_REDIRECT = os.getenv('REPORTS_ACCEL_REDIRECT')
 
 # Garantir que o diretório de relatórios existe
-os.makedirs(REPORTS_FOLDER, exist_ok=True)
+REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Última listagem de relatórios e o mtime do diretório em que foi feita
+_reports_cache = {'mtime_ns': None, 'files': None}
+
+def _invalidate_reports_cache():
+    """Descarta a listagem em cache (chamado após gravar um relatório)."""
+    _reports_cache['mtime_ns'] = None
+
+# Extensão e rótulo de cada formato de relatório
+REPORT_FORMATS = {
+    'pdf': ('pdf', 'PDF'),
+    'excel': ('xlsx', 'Excel')
+}
+
+# Geração de relatórios em segundo plano, fora da thread da requisição
+REPORT_WORKERS = 2
+MAX_REPORT_JOBS = 256
+_report_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix='report')
+_report_jobs = OrderedDict()
+# Protege _report_jobs, acessado pelas threads das requisições
+_report_jobs_lock = threading.Lock()
+
+def _write_report(report_data, report_type, format_type, output_path):
+    """
+    Grava o relatório no formato solicitado.
+    
+    Args:
+        report_data: Dados gerados pelo motor de chat
+        report_type: Tipo de relatório
+        format_type: Formato ('pdf' ou 'excel')
+        output_path: Caminho do arquivo de saída
+    """
+    # Relatórios tabulares recebem o resultado completo (DataFrame e colunas);
+    # o geral recebe o dicionário de estatísticas
+    content = report_data['data'] if report_type == 'geral' else report_data
+    
+    if format_type == 'pdf':
+        from src.services.pdf_generator import generate_pdf
+        generate_pdf(content, report_type, output_path)
+    else:
+        from src.services.excel_generator import generate_excel
+        generate_excel(content, report_type, output_path)
+    
+    _invalidate_reports_cache()
+
+def _register_job(job_id, future, filename):
+    """Registra um job, descartando os mais antigos já concluídos acima do limite."""
+    with _report_jobs_lock:
+        _report_jobs[job_id] = {'future': future, 'filename': filename}
+        
+        for old_id in list(_report_jobs):
+            if len(_report_jobs) <= MAX_REPORT_JOBS:
+                break
+            if _report_jobs[old_id]['future'].done():
+                del _report_jobs[old_id]
 
 @reports_bp.route('/api/reports/generate', methods=['POST'])
 def generate_report():
@@ -30,7 +98,14 @@ def generate_report():
     
     # Obter parâmetros
     report_type = request.json.get('type', 'geral')  # geral, motoristas, viagens, scores
-    format_type = request.json.get('format', 'pdf')  # pdf, excel
+    format_type = request.json.get('format', 'pdf').lower()  # pdf, excel
+    run_async = bool(request.json.get('async', False))
+    
+    if format_type not in REPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'Formato de relatório não suportado: {format_type}'
+        }), 400
     
     try:
         # Obter o motor de chat e processador de dados
@@ -54,45 +129,34 @@ def generate_report():
             }), 500
         
         # Gerar nome de arquivo único
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"relatorio_{report_type}_{timestamp}"
+        timestamp = time.time_ns()
+        extension, label = REPORT_FORMATS[format_type]
+        filename = f"relatorio_{report_type}_{timestamp}.{extension}"
+        output_path = REPORTS_DIR / filename
         
-        # Gerar relatório no formato solicitado
-        if format_type.lower() == 'pdf':
-            # Importar gerador de PDF
-            from src.services.pdf_generator import generate_pdf
-            
-            # Gerar PDF
-            pdf_path = os.path.join(REPORTS_FOLDER, f"{filename}.pdf")
-            generate_pdf(report_data['data'], report_type, pdf_path)
+        # Modo assíncrono: enfileirar a gravação e devolver o id do job imediatamente
+        if run_async:
+            job_id = uuid.uuid4().hex
+            future = _report_executor.submit(_write_report, report_data, report_type, format_type, output_path)
+            _register_job(job_id, future, filename)
             
             return jsonify({
                 'success': True,
-                'message': 'Relatório PDF gerado com sucesso',
-                'filename': f"{filename}.pdf",
-                'path': f"/api/reports/download/{filename}.pdf"
-            }), 200
-            
-        elif format_type.lower() == 'excel':
-            # Importar gerador de Excel
-            from src.services.excel_generator import generate_excel
-            
-            # Gerar Excel
-            excel_path = os.path.join(REPORTS_FOLDER, f"{filename}.xlsx")
-            generate_excel(report_data['data'], report_type, excel_path)
-            
-            return jsonify({
-                'success': True,
-                'message': 'Relatório Excel gerado com sucesso',
-                'filename': f"{filename}.xlsx",
-                'path': f"/api/reports/download/{filename}.xlsx"
-            }), 200
-            
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'Formato de relatório não suportado: {format_type}'
-            }), 400
+                'message': f'Relatório {label} em geração',
+                'job_id': job_id,
+                'status_path': f"/api/reports/status/{job_id}",
+                'filename': filename
+            }), 202
+        
+        # Gerar relatório no formato solicitado
+        _write_report(report_data, report_type, format_type, output_path)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Relatório {label} gerado com sucesso',
+            'filename': filename,
+            'path': f"/api/reports/download/{filename}"
+        }), 200
             
     except Exception as e:
         return jsonify({
@@ -100,16 +164,53 @@ def generate_report():
             'error': f'Erro ao gerar relatório: {str(e)}'
         }), 500
 
+@reports_bp.route('/api/reports/status/<job_id>', methods=['GET'])
+def report_status(job_id):
+    """
+    Endpoint para consultar o andamento de um relatório gerado em segundo plano.
+    """
+    with _report_jobs_lock:
+        job = _report_jobs.get(job_id)
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job não encontrado'
+        }), 404
+    
+    future = job['future']
+    
+    if not future.done():
+        return jsonify({
+            'success': True,
+            'status': 'running' if future.running() else 'queued'
+        }), 202
+    
+    error = future.exception()
+    if error is not None:
+        return jsonify({
+            'success': False,
+            'status': 'failed',
+            'error': f'Erro ao gerar relatório: {str(error)}'
+        }), 500
+    
+    return jsonify({
+        'success': True,
+        'status': 'finished',
+        'filename': job['filename'],
+        'path': f"/api/reports/download/{job['filename']}"
+    }), 200
+
 @reports_bp.route('/api/reports/download/<filename>', methods=['GET'])
 def download_report(filename):
     """
     Endpoint para download de relatórios gerados.
     """
     try:
-        file_path = os.path.join(REPORTS_FOLDER, filename)
+        file_path = REPORTS_DIR / filename
         
         # Verificar se o arquivo existe
-        if not os.path.exists(file_path):
+        if not file_path.is_file():
             return jsonify({
                 'success': False,
                 'error': 'Arquivo não encontrado'
@@ -123,12 +224,24 @@ def download_report(filename):
         else:
             mimetype = 'application/octet-stream'
         
-        # Enviar o arquivo
+        # Delegar a transferência ao Nginx, liberando o worker imediatamente
+        if REPORTS_ACCEL_REDIRECT:
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = f"{REPORTS_ACCEL_REDIRECT.rstrip('/')}/{quote(filename)}"
+            response.headers.set('Content-Disposition', 'attachment', filename=filename)
+            return response
+        
+        # Enviar o arquivo com ETag e Last-Modified; revalidações respondem 304 sem corpo
+        # (com USE_X_SENDFILE ativo, o servidor web faz a transferência)
         return send_file(
             file_path,
             mimetype=mimetype,
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            conditional=True,
+            etag=True,
+            last_modified=file_path.stat().st_mtime,
+            max_age=REPORT_MAX_AGE
         )
         
     except Exception as e:
@@ -143,23 +256,32 @@ def list_reports():
     Endpoint para listar relatórios disponíveis.
     """
     try:
-        # Listar arquivos no diretório de relatórios
-        files = []
-        for filename in os.listdir(REPORTS_FOLDER):
-            if filename.endswith('.pdf') or filename.endswith('.xlsx'):
-                file_path = os.path.join(REPORTS_FOLDER, filename)
-                file_stats = os.stat(file_path)
-                
-                files.append({
-                    'filename': filename,
-                    'path': f"/api/reports/download/{filename}",
-                    'size': file_stats.st_size,
-                    'created': datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
-                    'type': 'PDF' if filename.endswith('.pdf') else 'Excel'
-                })
-        
-        # Ordenar por data de criação (mais recente primeiro)
-        files.sort(key=lambda x: x['created'], reverse=True)
+        # Reaproveitar a última listagem enquanto o diretório não mudar
+        mtime_ns = REPORTS_DIR.stat().st_mtime_ns
+        files = _reports_cache['files']
+        
+        if files is None or _reports_cache['mtime_ns'] != mtime_ns:
+            # Listar arquivos no diretório de relatórios
+            files = []
+            with os.scandir(REPORTS_DIR) as entries:
+                for entry in entries:
+                    filename = entry.name
+                    if filename.endswith('.pdf') or filename.endswith('.xlsx'):
+                        file_stats = entry.stat()
+                        
+                        files.append({
+                            'filename': filename,
+                            'path': f"/api/reports/download/{filename}",
+                            'size': file_stats.st_size,
+                            'created': datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
+                            'type': 'PDF' if filename.endswith('.pdf') else 'Excel'
+                        })
+            
+            # Ordenar por data de criação (mais recente primeiro)
+            files.sort(key=lambda x: x['created'], reverse=True)
+            
+            _reports_cache['files'] = files
+            _reports_cache['mtime_ns'] = mtime_ns
         
         return jsonify({
             'success': True,
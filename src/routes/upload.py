@@ -14,6 +14,12 @@ upload_bp = Blueprint('upload', __name__)
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
 
+# Tamanho dos blocos de cópia do upload para o disco (1 MB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Tamanho máximo aceito para uploads (200 MB)
+MAX_UPLOAD_SIZE = 200 * 1024 * 1024
+
 # Garantir que o diretório de uploads existe
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -22,29 +28,52 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _stream_to_file(stream, filepath):
+    """
+    Copia o corpo da requisição para o disco em blocos, sem buffer intermediário.
+    
+    Args:
+        stream: Fluxo de entrada da requisição
+        filepath (str): Caminho de destino
+    """
+    with open(filepath, 'wb', buffering=UPLOAD_CHUNK_SIZE) as out:
+        while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+            out.write(chunk)
+
 @upload_bp.route('/api/upload', methods=['POST'])
 def upload_file():
     """
     Endpoint para upload de arquivos Excel.
+    
+    Aceita multipart/form-data (campo 'file') ou o corpo bruto do arquivo com
+    Content-Type application/octet-stream e o nome no parâmetro 'filename';
+    neste caso o corpo é gravado direto no disco, sem passar pelo parser de
+    formulários do Werkzeug.
     """
-    # Verificar se há arquivo na requisição
-    if 'file' not in request.files:
-        return jsonify({
-            'success': False,
-            'error': 'Nenhum arquivo enviado'
-        }), 400
+    raw_upload = request.mimetype == 'application/octet-stream'
     
-    file = request.files['file']
+    if raw_upload:
+        original_filename = request.args.get('filename', '')
+    else:
+        # Verificar se há arquivo na requisição
+        if 'file' not in request.files:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum arquivo enviado'
+            }), 400
+        
+        file = request.files['file']
+        original_filename = file.filename
     
     # Verificar se o usuário selecionou um arquivo
-    if file.filename == '':
+    if original_filename == '':
         return jsonify({
             'success': False,
             'error': 'Nenhum arquivo selecionado'
         }), 400
     
     # Verificar se o arquivo tem extensão permitida
-    if not allowed_file(file.filename):
+    if not allowed_file(original_filename):
         return jsonify({
             'success': False,
             'error': f'Formato de arquivo não permitido. Use: {", ".join(ALLOWED_EXTENSIONS)}'
@@ -52,16 +81,20 @@ def upload_file():
     
     try:
         # Gerar nome de arquivo seguro e único
-        filename = secure_filename(file.filename)
+        filename = secure_filename(original_filename)
         unique_filename = f"{uuid.uuid4()}_{filename}"
         filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
         
         # Salvar o arquivo
-        file.save(filepath)
+        if raw_upload:
+            _stream_to_file(request.stream, filepath)
+        else:
+            file.save(filepath, buffer_size=UPLOAD_CHUNK_SIZE)
         
         # Carregar o arquivo no processador de dados
         data_processor = current_app.config['DATA_PROCESSOR']
-        success = data_processor.load_data(filepath)
+        with data_processor.lock.write():
+            success = data_processor.load_data(filepath)
         
         if not success:
             return jsonify({
@@ -75,7 +108,7 @@ def upload_file():
         return jsonify({
             'success': True,
             'message': 'Arquivo carregado com sucesso',
-            'filename': file.filename,
+            'filename': original_filename,
             'metadata': metadata
         }), 200
         
@@ -0,0 +1,146 @@
+"""
+Despachante em lote para as perguntas do chat.
+
+Tira o processamento do chat da thread da requisição: as perguntas entram em uma
+fila, uma thread de fundo junta as que chegam dentro de uma janela curta e
+entrega cada lote a um pool de threads, que processa cada pergunta distinta uma
+única vez sobre o DataFrame atual, com as chamadas ao LLM do lote feitas em paralelo.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class ChatDispatcher:
+    """
+    Agrupa perguntas concorrentes do chat e as processa em lote.
+    """
+
+    def __init__(self, chat_engine, window=0.01, max_batch=32, max_workers=4):
+        """
+        Inicializa o despachante.
+
+        Args:
+            chat_engine: Instância do motor de chat
+            window (float): Janela de agrupamento em segundos
+            max_batch (int): Número máximo de perguntas por lote
+            max_workers (int): Número máximo de lotes processados ao mesmo tempo
+        """
+        self.chat_engine = chat_engine
+        self.window = window
+        self.max_batch = max_batch
+        # Os lotes rodam em um pool: um lote lento no LLM não segura os seguintes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-batch')
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, message):
+        """
+        Enfileira uma pergunta para processamento.
+
+        Args:
+            message (str): Pergunta em linguagem natural
+
+        Returns:
+            Future: Futuro que recebe o dicionário de resposta do motor de chat
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((message, future))
+        return future
+
+    def _ensure_worker(self):
+        """Inicia a thread de fundo na primeira pergunta."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='chat-dispatcher', daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self):
+        """
+        Bloqueia até a primeira pergunta e junta as que chegarem dentro da janela.
+
+        Returns:
+            list: Pares (mensagem, futuro)
+        """
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Laço da thread de fundo."""
+        while True:
+            batch = self._collect_batch()
+
+            try:
+                self._executor.submit(self._process_batch, batch)
+            except Exception as e:
+                # Uma falha no envio não pode derrubar a thread: o erro vai para quem espera
+                self._fail(batch, e)
+
+    def _process_batch(self, batch):
+        """
+        Processa um lote em uma thread do pool.
+
+        Args:
+            batch (list): Pares (mensagem, futuro)
+        """
+        try:
+            # Perguntas iguais no mesmo lote compartilham um único processamento.
+            # Futuros cancelados enquanto o lote esperava no pool (requisições que
+            # já desistiram por tempo esgotado) ficam de fora e não vão ao LLM
+            pending = {}
+            for message, future in batch:
+                if future.set_running_or_notify_cancel():
+                    pending.setdefault(message.strip(), []).append(future)
+
+            if pending:
+                self._process(pending)
+        except Exception as e:
+            self._fail(batch, e)
+
+    @staticmethod
+    def _fail(batch, error):
+        """Repassa um erro a todos os futuros ainda pendentes do lote."""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _process(self, pending):
+        """
+        Processa cada pergunta distinta do lote e distribui os resultados.
+
+        Args:
+            pending (dict): Mapa pergunta -> lista de futuros
+        """
+        # O motor de chat lê os dados sob a trava e a libera antes das chamadas ao
+        # LLM, que são feitas em paralelo para as perguntas do lote
+        messages = list(pending)
+        try:
+            responses = self.chat_engine.process_queries(messages)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for message, response in zip(messages, responses):
+            for future in pending[message]:
+                future.set_result(response)
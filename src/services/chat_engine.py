@@ -6,42 +6,46 @@ Utiliza LangChain e OpenAI para processar perguntas em linguagem natural.
 import os
 from typing import Dict, List, Any, Optional, Tuple
 import json
-import pandas as pd
+import re
+import threading
+from collections import OrderedDict
+import httpx
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain.chains import create_sql_query_chain
 from langchain.chains.llm import LLMChain
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-class ChatEngine:
-    """
-    Motor de chat com IA para consulta de dados de viagens de motoristas.
-    """
-    
-    def __init__(self, data_processor):
-        """
-        Inicializa o motor de chat.
-        
-        Args:
-            data_processor: Instância do processador de dados
-        """
-        self.data_processor = data_processor
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature=0,
-            api_key=os.getenv("OPENAI_API_KEY", "sk-dummy-key")
-        )
-        self.setup_chain()
-        
-    def setup_chain(self):
-        """Configura a cadeia de processamento do LangChain."""
-        # Template para o sistema
-        system_template = """
+# Número máximo de respostas mantidas no cache de perguntas
+RESPONSE_CACHE_SIZE = 256
+
+# Palavras-chave para identificar o tipo de consulta (em ordem de prioridade)
+QUERY_KEYWORDS = {
+    'motorista': ['motorista', 'condutor', 'driver'],
+    'viagem': ['viagem', 'trajeto', 'percurso', 'trip'],
+    'distância': ['distância', 'quilometragem', 'km', 'distance'],
+    'tempo': ['tempo', 'duração', 'duration', 'time'],
+    'consumo': ['consumo', 'combustível', 'fuel', 'consumption'],
+    'evento': ['infração', 'evento', 'violation', 'event'],
+    'score': ['score', 'pontuação', 'avaliação', 'rating']
+}
+
+# Tipo de consulta de cada termo e a prioridade de cada tipo
+_KEYWORD_TYPES = {term: key for key, terms in QUERY_KEYWORDS.items() for term in terms}
+_KEYWORD_PRIORITY = {key: i for i, key in enumerate(QUERY_KEYWORDS)}
+
+# Todos os termos em uma única expressão; o lookahead encontra também termos
+# sobrepostos, preservando a semântica de busca por substring
+_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(term) for term in _KEYWORD_TYPES) + '))'
+)
+
+# Template para o sistema
+SYSTEM_TEMPLATE = """
         Você é um assistente especializado em análise de dados de viagens de motoristas de frota.
         Sua função é responder perguntas sobre os dados com base nas informações disponíveis.
         
@@ -59,29 +63,91 @@ class ChatEngine:
         Responda de forma clara e objetiva, fornecendo análises relevantes para gestores de frota e segurança.
         Se não conseguir responder com os dados disponíveis, explique o motivo.
         """
-        
-        # Template para o usuário
-        user_template = """
+
+# Template para o usuário
+USER_TEMPLATE = """
         Pergunta: {question}
         """
+
+# Prompt completo, montado uma única vez na importação do módulo
+CHAT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_TEMPLATE),
+    ("human", USER_TEMPLATE)
+])
+
+# Cliente do LLM compartilhado por todos os motores de chat do processo (e pelos
+# workers do gunicorn quando a aplicação é pré-carregada com --preload)
+_shared_llm = None
+_shared_llm_lock = threading.Lock()
+
+def get_llm() -> ChatOpenAI:
+    """
+    Retorna o cliente ChatOpenAI compartilhado, criando-o na primeira chamada.
+    
+    O cliente usa um pool HTTP com conexões persistentes, de modo que o
+    handshake TLS é reaproveitado entre as perguntas.
+    
+    Returns:
+        ChatOpenAI: Cliente do LLM
+    """
+    global _shared_llm
+    if _shared_llm is None:
+        with _shared_llm_lock:
+            if _shared_llm is None:
+                _shared_llm = ChatOpenAI(
+                    model="gpt-3.5-turbo",
+                    temperature=0,
+                    api_key=os.getenv("OPENAI_API_KEY", "sk-dummy-key"),
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_keepalive_connections=32)
+                    )
+                )
+    return _shared_llm
+
+class ChatEngine:
+    """
+    Motor de chat com IA para consulta de dados de viagens de motoristas.
+    """
+    
+    def __init__(self, data_processor):
+        """
+        Inicializa o motor de chat.
         
-        # Criar o prompt completo
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_template),
-            ("human", user_template)
-        ])
+        Args:
+            data_processor: Instância do processador de dados
+        """
+        self.data_processor = data_processor
+        self.llm = get_llm()
+        # Entradas do prompt serializadas, válidas para uma versão dos dados
+        self._prompt_inputs_version = None
+        self._metadata_json = None
+        self._summary_json = None
+        # Respostas por (versão dos dados, pergunta), em ordem de uso
+        self._response_cache = OrderedDict()
+        # Os lotes do despachante rodam em paralelo e compartilham o cache
+        self._response_cache_lock = threading.Lock()
+        self.setup_chain()
         
-        # Configurar a cadeia
-        self.chain = (
-            {
-                "question": RunnablePassthrough(),
-                "metadata": lambda _: json.dumps(self.data_processor.get_metadata(), indent=2),
-                "summary_stats": lambda _: json.dumps(self.data_processor.get_summary_stats(), indent=2)
-            }
-            | prompt
-            | self.llm
-            | StrOutputParser()
-        )
+    def setup_chain(self):
+        """Configura a cadeia de processamento do LangChain."""
+        # Configurar a cadeia; metadados e estatísticas entram já serializados junto
+        # com a pergunta, para que a chamada ao LLM não dependa dos dados carregados
+        self.chain = CHAT_PROMPT | self.llm | StrOutputParser()
+    
+    def _get_prompt_inputs(self) -> Tuple[str, str]:
+        """
+        Retorna metadados e estatísticas em JSON, serializados uma vez por carga de dados.
+        
+        Returns:
+            Tuple[str, str]: Metadados e estatísticas resumidas em JSON
+        """
+        version = self.data_processor.version
+        if self._prompt_inputs_version != version:
+            self._metadata_json = json.dumps(self.data_processor.get_metadata(), indent=2, default=str)
+            self._summary_json = json.dumps(self.data_processor.get_summary_stats(), indent=2, default=str)
+            self._prompt_inputs_version = version
+        
+        return self._metadata_json, self._summary_json
     
     def process_query(self, query: str) -> Dict:
         """
@@ -93,31 +159,91 @@ class ChatEngine:
         Returns:
             Dict: Resposta processada
         """
-        if self.data_processor.data is None:
-            return {
-                "answer": "Não há dados carregados. Por favor, faça o upload de um arquivo Excel primeiro.",
-                "data": None,
-                "error": "Dados não carregados"
-            }
+        return self.process_queries([query])[0]
+    
+    def process_queries(self, queries: List[str]) -> List[Dict]:
+        """
+        Processa várias consultas, enviando ao LLM em paralelo as que não estão em cache.
         
-        try:
-            # Processar a pergunta com o LLM
-            answer = self.chain.invoke(query)
+        Args:
+            queries: Perguntas em linguagem natural
             
-            # Tentar extrair dados relevantes com base na pergunta
-            relevant_data = self._extract_relevant_data(query)
+        Returns:
+            List[Dict]: Respostas processadas, na mesma ordem das perguntas
+        """
+        # Tudo o que depende do DataFrame é lido sob a trava; ela é liberada antes
+        # das chamadas ao LLM para não bloquear um upload durante a resposta
+        with self.data_processor.lock.read():
+            if self.data_processor.data is None:
+                return [{
+                    "answer": "Não há dados carregados. Por favor, faça o upload de um arquivo Excel primeiro.",
+                    "data": None,
+                    "error": "Dados não carregados"
+                } for _ in queries]
             
-            return {
-                "answer": answer,
-                "data": relevant_data,
-                "error": None
-            }
-        except Exception as e:
-            return {
-                "answer": f"Ocorreu um erro ao processar sua pergunta: {str(e)}",
-                "data": None,
-                "error": str(e)
-            }
+            # Perguntas repetidas sobre os mesmos dados não voltam ao LLM
+            version = self.data_processor.version
+            responses = [None] * len(queries)
+            pending = []
+            for i, query in enumerate(queries):
+                cache_key = (version, query)
+                with self._response_cache_lock:
+                    cached = self._response_cache.get(cache_key)
+                    if cached is not None:
+                        self._response_cache.move_to_end(cache_key)
+                if cached is not None:
+                    responses[i] = cached
+                else:
+                    pending.append(i)
+            
+            if not pending:
+                return responses
+            
+            metadata_json, summary_json = self._get_prompt_inputs()
+            
+            # Tentar extrair dados relevantes com base em cada pergunta
+            relevant_data = {}
+            for i in pending:
+                try:
+                    relevant_data[i] = self._extract_relevant_data(queries[i])
+                except Exception as e:
+                    relevant_data[i] = e
+        
+        # Processar as perguntas com o LLM: as chamadas do lote seguem simultâneas
+        answers = self.chain.batch([
+            {"question": queries[i], "metadata": metadata_json, "summary_stats": summary_json}
+            for i in pending
+        ], return_exceptions=True)
+        
+        for i, answer in zip(pending, answers):
+            query = queries[i]
+            try:
+                if isinstance(answer, Exception):
+                    raise answer
+                if isinstance(relevant_data[i], Exception):
+                    raise relevant_data[i]
+                
+                response = {
+                    "answer": answer,
+                    "data": relevant_data[i],
+                    "error": None
+                }
+            except Exception as e:
+                responses[i] = {
+                    "answer": f"Ocorreu um erro ao processar sua pergunta: {str(e)}",
+                    "data": None,
+                    "error": str(e)
+                }
+                continue
+            
+            with self._response_cache_lock:
+                self._response_cache[(version, query)] = response
+                if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                    self._response_cache.popitem(last=False)
+            
+            responses[i] = response
+        
+        return responses
     
     def _extract_relevant_data(self, query: str) -> Optional[Dict]:
         """
@@ -129,28 +255,14 @@ class ChatEngine:
         Returns:
             Optional[Dict]: Dados relevantes ou None
         """
-        # Palavras-chave para identificar o tipo de consulta
-        keywords = {
-            'motorista': ['motorista', 'condutor', 'driver'],
-            'viagem': ['viagem', 'trajeto', 'percurso', 'trip'],
-            'distância': ['distância', 'quilometragem', 'km', 'distance'],
-            'tempo': ['tempo', 'duração', 'duration', 'time'],
-            'consumo': ['consumo', 'combustível', 'fuel', 'consumption'],
-            'evento': ['infração', 'evento', 'violation', 'event'],
-            'score': ['score', 'pontuação', 'avaliação', 'rating']
-        }
-        
-        # Identificar tipo de consulta
-        query_type = None
-        for key, terms in keywords.items():
-            if any(term in query.lower() for term in terms):
-                query_type = key
-                break
+        # Identificar tipo de consulta: o tipo de maior prioridade entre os termos encontrados
+        found = {_KEYWORD_TYPES[match.group(1)] for match in _KEYWORD_RE.finditer(query.lower())}
+        query_type = min(found, key=_KEYWORD_PRIORITY.get) if found else None
         
         # Extrair dados com base no tipo de consulta
         if query_type == 'motorista':
             # Buscar dados de motoristas
-            driver_col = self.data_processor._find_column_by_pattern(keywords['motorista'])
+            driver_col = self.data_processor.get_alias_column('motorista')
             if driver_col:
                 drivers = self.data_processor.data[driver_col].unique().tolist()
                 return {
@@ -169,8 +281,8 @@ class ChatEngine:
         
         elif query_type in ['distância', 'tempo', 'consumo']:
             # Buscar métricas agregadas
-            metric_col = self.data_processor._find_column_by_pattern(keywords[query_type])
-            driver_col = self.data_processor._find_column_by_pattern(keywords['motorista'])
+            metric_col = self.data_processor._find_column_by_pattern(QUERY_KEYWORDS[query_type])
+            driver_col = self.data_processor.get_alias_column('motorista')
             
             if metric_col and driver_col:
                 metrics = self.data_processor.calculate_metrics(driver_col, metric_col, 'mean')
@@ -204,23 +316,20 @@ class ChatEngine:
         try:
             if report_type == 'motoristas':
                 # Relatório de motoristas
-                driver_col = self.data_processor._find_column_by_pattern(
-                    ['motorista', 'condutor', 'driver']
-                )
+                driver_col = self.data_processor.get_alias_column('motorista')
                 
                 if not driver_col:
                     return {"error": "Coluna de motoristas não encontrada", "data": None}
                 
-                # Agrupar dados por motorista
-                driver_data = self.data_processor.data.groupby(driver_col).agg({
-                    col: 'count' if self.data_processor.column_types.get(col) == 'text' else 'mean'
-                    for col in self.data_processor.data.columns
-                    if col != driver_col and pd.api.types.is_numeric_dtype(self.data_processor.data[col])
-                }).reset_index()
+                # Agrupar dados por motorista: média de todas as colunas numéricas em uma única agregação
+                data = self.data_processor.data
+                numeric_cols = data.select_dtypes(include='number').columns.drop(driver_col, errors='ignore')
+                driver_data = data.groupby(driver_col, observed=True)[numeric_cols].mean().reset_index()
                 
+                # O DataFrame segue direto para os geradores, sem conversão para dicts
                 return {
                     "error": None,
-                    "data": driver_data.to_dict(orient='records'),
+                    "data": driver_data,
                     "columns": driver_data.columns.tolist()
                 }
                 
@@ -233,37 +342,31 @@ class ChatEngine:
                 
                 return {
                     "error": None,
-                    "data": scores.to_dict(orient='records'),
+                    "data": scores,
                     "columns": scores.columns.tolist()
                 }
                 
             elif report_type == 'viagens':
                 # Relatório de viagens
-                # Selecionar colunas relevantes
-                relevant_cols = []
-                
-                for pattern in [
-                    ['motorista', 'condutor', 'driver'],
-                    ['data', 'date'],
-                    ['origem', 'partida', 'origin', 'start'],
-                    ['destino', 'chegada', 'destination', 'end'],
-                    ['distancia', 'km', 'quilometragem', 'distance'],
-                    ['tempo', 'duracao', 'duration', 'time'],
-                    ['consumo', 'combustivel', 'fuel', 'consumption']
-                ]:
-                    col = self.data_processor._find_column_by_pattern(pattern)
-                    if col:
-                        relevant_cols.append(col)
+                # Selecionar colunas relevantes (resolvidas uma vez na carga dos dados)
+                relevant_cols = list(dict.fromkeys(
+                    col for col in (
+                        self.data_processor.get_alias_column(key)
+                        for key in ('motorista', 'data', 'origem', 'destino', 'distancia', 'tempo', 'consumo')
+                    )
+                    if col
+                ))
                 
                 if not relevant_cols:
                     return {"error": "Colunas relevantes não encontradas", "data": None}
                 
-                # Limitar a 1000 viagens para o relatório
-                trips_data = self.data_processor.data[relevant_cols].head(1000)
+                # Limitar a 1000 viagens para o relatório: fatiar as linhas antes de
+                # projetar as colunas, para copiar apenas as 1000 primeiras
+                trips_data = self.data_processor.data.iloc[:1000][relevant_cols]
                 
                 return {
                     "error": None,
-                    "data": trips_data.to_dict(orient='records'),
+                    "data": trips_data,
                     "columns": trips_data.columns.tolist()
                 }
                 
@@ -273,9 +376,12 @@ class ChatEngine:
                 summary = self.data_processor.get_summary_stats()
                 
                 # Calcular estatísticas adicionais
+                # Os geradores esperam as estatísticas numéricas em summary['numeric']
                 stats = {
                     "metadata": metadata,
-                    "summary": summary,
+                    "summary": {
+                        "numeric": {col: col_stats for col, col_stats in summary.items() if 'mean' in col_stats}
+                    },
                     "sample": self.data_processor.get_data_sample(5).to_dict(orient='records')
                 }
                 
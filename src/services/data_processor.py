@@ -3,12 +3,112 @@ Módulo para processamento de dados de planilhas.
 """
 
 import os
+import logging
 import pandas as pd
 import numpy as np
 import json
+import orjson
 import math
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import pyarrow  # noqa: F401
+    ARROW_STRINGS = True
+except ImportError:  # Sem pyarrow, colunas de texto ficam como objetos Python
+    ARROW_STRINGS = False
+
+logger = logging.getLogger(__name__)
+
+# Padrões de nome para as colunas conhecidas dos dados de viagens
+COLUMN_ALIASES = {
+    'motorista': ['motorista', 'condutor', 'driver'],
+    'data': ['data', 'date'],
+    'origem': ['origem', 'partida', 'origin', 'start'],
+    'destino': ['destino', 'chegada', 'destination', 'end'],
+    'distancia': ['distancia', 'km', 'quilometragem', 'distance'],
+    'tempo': ['tempo', 'duracao', 'duration', 'time'],
+    'consumo': ['consumo', 'combustivel', 'fuel', 'consumption']
+}
+
+# Número de planilhas já convertidas mantidas em memória. Cada upload é salvo em um
+# caminho novo, então entradas antigas nunca voltam a ser usadas pela aplicação: com
+# uma só, o cache guarda apenas o DataFrame atual (já referenciado por self.data)
+READ_CACHE_SIZE = 1
+
+# Threads usadas no cálculo das estatísticas resumidas
+SUMMARY_WORKERS = os.cpu_count() or 1
+
+# Proporção máxima de valores distintos para converter uma coluna de texto em categoria
+CATEGORY_RATIO = 0.5
+
+def _json_safe(data):
+    """
+    Converte um DataFrame ou Series para objetos Python com NaN/Infinity trocados por None.
+    
+    Args:
+        data: pandas.DataFrame ou pandas.Series
+        
+    Returns:
+        DataFrame ou Series de dtype object pronto para serialização em JSON
+    """
+    if isinstance(data, pd.DataFrame):
+        floats = data.select_dtypes(include='floating').columns
+        if len(floats):
+            data = data.copy(deep=False)
+            data[floats] = data[floats].replace([np.inf, -np.inf], np.nan)
+    elif pd.api.types.is_float_dtype(data):
+        data = data.replace([np.inf, -np.inf], np.nan)
+    
+    return data.astype(object).where(data.notna(), None)
+
+def _is_number(value):
+    """Verifica se o valor é um número (int/float do Python ou escalar NumPy), exceto bool."""
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+class ReadWriteLock:
+    """
+    Trava de leitores/escritor: várias leituras simultâneas, escrita exclusiva.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+    
+    @contextmanager
+    def read(self):
+        """Adquire a trava para leitura."""
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        """Adquire a trava para escrita exclusiva."""
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
 class DataProcessor:
     """
     Classe para processamento de dados de planilhas.
@@ -21,26 +121,320 @@ class DataProcessor:
         self.data = None
         self.metadata = None
         self.file_path = None
+        self.lock = ReadWriteLock()
+        # Estatísticas resumidas e seu JSON como (versão dos dados, valor)
+        self._summary_cache = None
+        self._summary_json = None
+        # Coluna resolvida para cada chave de COLUMN_ALIASES (ou None)
+        self._alias_index = {}
+        # Nomes das colunas em minúsculas e buscas por padrão já resolvidas
+        self._cols_lower = []
+        self._pattern_cache = {}
+        # Agregações por motorista, calculadas uma vez por carga de dados
+        self._scores_cache = None
+        self._metrics_cache = {}
+        # Arrays NumPy das colunas numéricas e de texto, para comparações vetorizadas
+        self._columns = {}
+        # Incrementado a cada nova carga; permite que consumidores invalidem seus caches
+        self.version = 0
     
-    def load_excel(self, file_path):
+    def load_data(self, file_path, usecols=None):
         """
         Carrega dados de um arquivo Excel.
         
         Args:
             file_path (str): Caminho para o arquivo Excel.
+            usecols (list, optional): Colunas a serem lidas (None para todas).
             
         Returns:
             bool: True se o carregamento foi bem-sucedido, False caso contrário.
         """
         try:
             self.file_path = file_path
-            self.data = pd.read_excel(file_path)
+            # Reabrir um arquivo inalterado reaproveita o DataFrame já convertido; a cópia
+            # rasa protege o cache de atribuições de coluna feitas nesta instância
+            st = os.stat(file_path)
+            data = _cached_read(
+                os.path.abspath(file_path), st.st_mtime_ns, st.st_size,
+                tuple(usecols) if usecols is not None else None
+            ).copy(deep=False)
+            
+            # Descartar o resumo da carga anterior antes de trocar o DataFrame (o upload
+            # chama este método com a trava de escrita)
+            self._summary_cache = None
+            self._summary_json = None
+            self.data = data
+            self.invalidate_caches()
             self.extract_metadata()
+            
+            # Pré-calcular em segundo plano as agregações usadas pelo chat
+            threading.Thread(target=self._warm_caches, args=(self.data,), daemon=True).start()
             return True
         except Exception as e:
             print(f"Erro ao carregar arquivo Excel: {str(e)}")
             return False
     
+    def load_excel(self, file_path):
+        """
+        Carrega dados de um arquivo Excel (mantido por compatibilidade; use load_data).
+        
+        Args:
+            file_path (str): Caminho para o arquivo Excel.
+            
+        Returns:
+            bool: True se o carregamento foi bem-sucedido, False caso contrário.
+        """
+        return self.load_data(file_path)
+    
+    def load_preview(self, file_path, n=1000, usecols=None):
+        """
+        Lê apenas as primeiras linhas de uma planilha, sem alterar os dados carregados.
+        
+        O leitor para após n linhas, então o custo não cresce com o tamanho da aba.
+        Estatísticas calculadas sobre a prévia são apenas aproximadas.
+        
+        Args:
+            file_path (str): Caminho para o arquivo Excel.
+            n (int): Número máximo de linhas de dados.
+            usecols (list, optional): Colunas a serem lidas (None para todas).
+            
+        Returns:
+            pandas.DataFrame: Primeiras linhas da planilha ou None em caso de erro.
+        """
+        try:
+            return self._shrink_dtypes(self._read_excel(file_path, usecols=usecols, nrows=n))
+        except Exception as e:
+            print(f"Erro ao ler prévia do arquivo Excel: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _read_excel(file_path, usecols=None, nrows=None):
+        """
+        Lê a primeira aba da planilha sem montar o DOM completo do openpyxl.
+        
+        Usa o leitor em Rust do python-calamine quando disponível (descompressão
+        e parsing intercalados, memória proporcional à largura da aba); sem ele,
+        arquivos .xlsx são percorridos linha a linha em modo read-only e outros
+        formatos (.xls) seguem pelo pd.read_excel.
+        
+        Args:
+            file_path (str): Caminho para o arquivo Excel.
+            usecols (list, optional): Colunas a serem lidas (None para todas); as
+                demais não chegam a ser convertidas pelo leitor.
+            nrows (int, optional): Número máximo de linhas de dados (None para todas);
+                o restante da aba não é lido.
+            
+        Returns:
+            pandas.DataFrame: Dados da primeira aba.
+        """
+        try:
+            return pd.read_excel(file_path, engine='calamine', usecols=usecols, nrows=nrows)
+        except ImportError:
+            pass
+        
+        if not file_path.lower().endswith('.xlsx'):
+            return pd.read_excel(file_path, usecols=usecols, nrows=nrows)
+        
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return pd.DataFrame()
+            
+            # Projetar apenas as colunas pedidas, na ordem em que aparecem na planilha
+            if usecols is not None:
+                wanted = set(usecols)
+                missing = wanted - set(header)
+                if missing:
+                    raise ValueError(f"Colunas não encontradas na planilha: {sorted(missing)}")
+                positions = [i for i, col in enumerate(header) if col in wanted]
+                header = [header[i] for i in positions]
+                rows = ([row[i] for i in positions] for row in rows)
+            
+            if nrows is not None:
+                rows = itertools.islice(rows, nrows)
+            
+            # Em modo read-only as dimensões gravadas na aba podem incluir linhas vazias
+            # no final (células formatadas, exclusões); descartá-las como o pd.read_excel faz
+            records = list(rows)
+            while records and all(value is None for value in records[-1]):
+                records.pop()
+            
+            df = pd.DataFrame.from_records(records, columns=header)
+        finally:
+            workbook.close()
+        
+        # Ajustar tipos como o pd.read_excel faria (colunas object com números viram numéricas)
+        return df.infer_objects()
+    
+    @staticmethod
+    def _shrink_dtypes(df):
+        """
+        Reduz os tipos das colunas logo após a leitura.
+        
+        Inteiros são rebaixados para o menor tipo que comporta os valores (floats
+        continuam float64: em float32, 12.3 viraria 12.3000001907 no JSON e nos
+        relatórios); colunas de texto com poucos valores distintos
+        (ex.: motorista) viram categoria, e agrupamentos e unique() passam a operar
+        sobre códigos inteiros em vez de fazer hash de strings Python. As demais
+        colunas só de texto passam para strings do Arrow (buffer contíguo) quando o
+        pyarrow está instalado.
+        
+        Args:
+            df (pandas.DataFrame): Dados recém-carregados.
+            
+        Returns:
+            pandas.DataFrame: O mesmo DataFrame com os tipos reduzidos.
+        """
+        num_rows = len(df)
+        if num_rows == 0:
+            return df
+        
+        log_memory = logger.isEnabledFor(logging.DEBUG)
+        if log_memory:
+            memory_before = df.memory_usage().sum()
+        
+        for col in df.columns:
+            series = df[col]
+            
+            if pd.api.types.is_bool_dtype(series):
+                continue
+            elif pd.api.types.is_integer_dtype(series):
+                downcast = 'unsigned' if series.min() >= 0 else 'integer'
+                df[col] = pd.to_numeric(series, downcast=downcast)
+            elif series.dtype == object:
+                if series.nunique() / num_rows < CATEGORY_RATIO:
+                    df[col] = series.astype('category')
+                elif (ARROW_STRINGS and series.notna().all()
+                      and pd.api.types.infer_dtype(series, skipna=False) == 'string'):
+                    # Sem valores ausentes, para não introduzir pd.NA nos geradores de relatório
+                    df[col] = series.astype('string[pyarrow]')
+        
+        if log_memory:
+            memory_after = df.memory_usage().sum()
+            logger.debug(f"Tipos reduzidos: {memory_before / (1024 * 1024):.2f} MB -> {memory_after / (1024 * 1024):.2f} MB")
+        
+        return df
+    
+    @staticmethod
+    def clear_cache():
+        """
+        Descarta as planilhas mantidas em memória pelo cache de leitura.
+        """
+        _cached_read.cache_clear()
+    
+    def invalidate_caches(self):
+        """
+        Descarta os resultados calculados sobre os dados anteriores.
+        """
+        self.version += 1
+        self._summary_cache = None
+        self._summary_json = None
+        self._scores_cache = None
+        self._metrics_cache = {}
+        self._pattern_cache = {}
+        self._cols_lower = [] if self.data is None else [(col, str(col).lower()) for col in self.data.columns]
+        self._build_alias_index()
+        self._build_column_arrays()
+    
+    def _warm_caches(self, data):
+        """
+        Pré-calcula scores e médias por motorista para os dados recém-carregados.
+        
+        Args:
+            data (pandas.DataFrame): Dados para os quais o cache é aquecido; se outra
+                carga acontecer no meio, os resultados são descartados.
+        """
+        try:
+            self.calculate_driver_scores()
+            
+            driver_col = self.get_alias_column('motorista')
+            for key in ('distancia', 'tempo', 'consumo'):
+                metric_col = self.get_alias_column(key)
+                if self.data is not data:
+                    return
+                if driver_col and metric_col:
+                    self.calculate_metrics(driver_col, metric_col, 'mean')
+        except Exception as e:
+            print(f"Erro ao pré-calcular agregações: {str(e)}")
+    
+    def _build_alias_index(self):
+        """
+        Resolve uma única vez a coluna de cada chave de COLUMN_ALIASES.
+        """
+        if self.data is None:
+            self._alias_index = {}
+            return
+        
+        self._alias_index = {
+            key: self._find_column_by_pattern(patterns)
+            for key, patterns in COLUMN_ALIASES.items()
+        }
+    
+    def _build_column_arrays(self):
+        """
+        Guarda uma visão NumPy (sem cópia) de cada coluna dos dados carregados.
+        
+        Só entram colunas numéricas e de texto. Categóricas ficam de fora porque
+        to_numpy() materializaria um array de objetos (a comparação do pandas já
+        opera sobre os códigos inteiros), e datas porque a comparação do pandas
+        converte strings para datas.
+        """
+        if self.data is None:
+            self._columns = {}
+            return
+        
+        self._columns = {
+            col: self.data[col].to_numpy(copy=False)
+            for col, dtype in self.data.dtypes.items()
+            if dtype == object or pd.api.types.is_numeric_dtype(dtype)
+        }
+    
+    def _find_column_by_pattern(self, patterns):
+        """
+        Encontra a coluna cujo nome contém um dos padrões, na ordem de prioridade.
+        
+        Cada padrão é procurado em todas as colunas antes de passar ao seguinte, de
+        modo que 'destino' vence 'chegada' mesmo que data_chegada venha antes.
+        
+        Args:
+            patterns (list): Padrões a procurar, do mais ao menos prioritário
+                (sem diferenciar maiúsculas).
+            
+        Returns:
+            str: Nome da coluna ou None se nenhuma corresponder.
+        """
+        if self.data is None:
+            return None
+        
+        key = tuple(patterns)
+        if key in self._pattern_cache:
+            return self._pattern_cache[key]
+        
+        found = None
+        for pattern in patterns:
+            pattern = pattern.lower()
+            found = next((col for col, name in self._cols_lower if pattern in name), None)
+            if found is not None:
+                break
+        
+        self._pattern_cache[key] = found
+        return found
+    
+    def get_alias_column(self, key):
+        """
+        Retorna a coluna resolvida para uma chave de COLUMN_ALIASES.
+        
+        Args:
+            key (str): Chave de COLUMN_ALIASES (ex.: 'motorista', 'distancia').
+            
+        Returns:
+            str: Nome da coluna ou None se não encontrada.
+        """
+        return self._alias_index.get(key)
+    
     def extract_metadata(self):
         """
         Extrai metadados dos dados carregados.
@@ -54,9 +448,25 @@ class DataProcessor:
             'num_columns': len(self.data.columns),
             'columns': list(self.data.columns),
             'file_name': os.path.basename(self.file_path) if self.file_path else None,
+            # Tamanho dos blocos apenas (deep=False não percorre as strings célula a célula)
+            'memory_usage': round(float(self.data.memory_usage(deep=False).sum()) / (1024 * 1024), 2),
             'load_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     
+    def get_deep_memory_usage_mb(self):
+        """
+        Calcula o uso de memória exato dos dados, incluindo o conteúdo das strings.
+        
+        Percorre cada célula de texto; use apenas quando o valor preciso for necessário.
+        
+        Returns:
+            float: Memória em MB ou None se não houver dados carregados.
+        """
+        if self.data is None:
+            return None
+        
+        return self.data.memory_usage(deep=True).sum() / (1024 * 1024)
+    
     def get_metadata(self):
         """
         Retorna os metadados dos dados carregados.
@@ -83,13 +493,21 @@ class DataProcessor:
         elif isinstance(data, list):
             return [self.sanitize_data(v) for v in data]
         elif isinstance(data, pd.DataFrame):
-            # Converte o DataFrame para dicionário e sanitiza
-            return self.sanitize_data(data.to_dict(orient='records'))
+            # Troca NaN/Infinity por None de forma vetorizada antes de converter para dicionário
+            return _json_safe(data).to_dict(orient='records')
         elif isinstance(data, pd.Series):
-            # Converte a Series para dicionário e sanitiza
-            return self.sanitize_data(data.to_dict())
+            # Troca NaN/Infinity por None de forma vetorizada antes de converter para dicionário
+            return _json_safe(data).to_dict()
         elif isinstance(data, np.ndarray):
-            # Converte arrays numpy para lista e sanitiza
+            # Despacha pelo tipo do array: só arrays de objetos passam pela recursão
+            kind = data.dtype.kind
+            if kind in 'iub':
+                # Inteiros e booleanos não têm NaN/Infinity
+                return data.tolist()
+            elif kind == 'f':
+                values = data.astype(object)
+                values[~np.isfinite(data)] = None
+                return values.tolist()
             return self.sanitize_data(data.tolist())
         elif isinstance(data, np.integer):
             return int(data)
@@ -98,6 +516,21 @@ class DataProcessor:
         else:
             return data
     
+    def get_data_sample(self, n=5):
+        """
+        Retorna uma amostra (primeiras linhas) dos dados carregados.
+        
+        Args:
+            n (int): Número de linhas da amostra.
+            
+        Returns:
+            pandas.DataFrame: Amostra dos dados ou None se não houver dados carregados.
+        """
+        if self.data is None:
+            return None
+        
+        return self.data.head(n)
+    
     def get_data_for_query(self, query=None):
         """
         Retorna os dados para consulta, opcionalmente filtrados.
@@ -131,9 +564,8 @@ class DataProcessor:
         if self.data is None:
             return json.dumps({})
         
-        # Sanitizar os dados antes de converter para JSON
-        sanitized_data = self.sanitize_data(self.data)
-        return json.dumps(sanitized_data)
+        # O writer JSON do pandas já emite null para NaN/Infinity, sem passar por objetos Python
+        return self.data.to_json(orient='records', double_precision=10, date_format='iso', force_ascii=False, default_handler=str)
     
     def get_summary_stats(self):
         """
@@ -145,27 +577,146 @@ class DataProcessor:
         if self.data is None:
             return None
         
-        numeric_columns = self.data.select_dtypes(include=['number']).columns
+        # O cache vale para uma versão dos dados (incrementada a cada carga)
+        version = self.version
+        if self._summary_cache is not None and self._summary_cache[0] == version:
+            return self._summary_cache[1]
         
+        data = self.data
         stats = {}
-        for col in numeric_columns:
-            stats[col] = {
-                'mean': self.data[col].mean(),
-                'median': self.data[col].median(),
-                'min': self.data[col].min(),
-                'max': self.data[col].max(),
-                'std': self.data[col].std()
+        category_columns = data.select_dtypes(include=['category']).columns
+        
+        # As colunas são independentes: contagens de ausentes e de valores das colunas
+        # categóricas rodam em threads (o NumPy libera o GIL) enquanto esta calcula o describe()
+        with ThreadPoolExecutor(max_workers=min(len(category_columns) + 1, SUMMARY_WORKERS)) as executor:
+            missing_future = executor.submit(lambda: data.isna().sum())
+            # Colunas categóricas: contagem sobre os códigos inteiros, sem fazer hash de strings
+            top_futures = {
+                col: executor.submit(lambda col=col: data[col].value_counts().head(20).to_dict())
+                for col in category_columns
             }
+            
+            # Uma única passada do describe() em vez de cinco reduções por coluna
+            numeric = data.select_dtypes(include=['number'])
+            if len(numeric.columns):
+                described = numeric.describe().T[['mean', '50%', 'min', 'max', 'std']]
+                stats = described.rename(columns={'50%': 'median'}).to_dict(orient='index')
+            
+            for col, future in top_futures.items():
+                stats[col] = {'top_values': future.result()}
+            
+            missing = missing_future.result()
+        
+        for col in stats:
+            stats[col]['missing'] = missing[col]
         
-        # Sanitizar as estatísticas antes de retornar
-        return self.sanitize_data(stats)
+        # Sanitizar as estatísticas antes de guardar em cache; se outra carga aconteceu
+        # durante o cálculo, o resultado (dos dados antigos) não é guardado
+        summary = self.sanitize_data(stats)
+        if self.version == version and self.data is data:
+            self._summary_cache = (version, summary)
+        return summary
+    
+    def get_summary_json(self):
+        """
+        Retorna as estatísticas resumidas já serializadas em JSON.
+        
+        Returns:
+            bytes: Estatísticas em JSON (calculadas uma vez por carga de dados)
+                ou None se não houver dados carregados.
+        """
+        if self.data is None:
+            return None
+        
+        # Como as estatísticas, o JSON é guardado junto da versão dos dados
+        version = self.version
+        if self._summary_json is not None and self._summary_json[0] == version:
+            return self._summary_json[1]
+        
+        data = self.data
+        summary = self.get_summary_stats()
+        # orjson (em Rust) aceita escalares NumPy e chaves não-string sem conversão prévia
+        summary_json = orjson.dumps(
+            summary, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+        if self.version == version and self.data is data:
+            self._summary_json = (version, summary_json)
+        
+        return summary_json
+    
+    def calculate_driver_scores(self):
+        """
+        Calcula a média das colunas de score e o número de viagens de cada motorista.
+        
+        Returns:
+            pandas.DataFrame: Uma linha por motorista, ordenada pelo primeiro score
+                (decrescente); vazio se não houver coluna de motorista ou de score.
+        """
+        data = self.data
+        if data is None:
+            return pd.DataFrame()
+        
+        if self._scores_cache is not None:
+            return self._scores_cache
+        
+        driver_col = self.get_alias_column('motorista')
+        score_cols = [
+            col for col in data.select_dtypes(include='number').columns
+            if 'score' in str(col).lower()
+        ]
+        
+        if not driver_col or not score_cols:
+            return pd.DataFrame()
+        
+        # Contagem de viagens e médias dos scores em uma única agregação (sem ordenar
+        # os grupos, já que o resultado é ordenado pelo score em seguida)
+        scores = data.groupby(driver_col, sort=False, observed=True).agg(
+            num_viagens=(score_cols[0], 'size'),
+            **{col: (col, 'mean') for col in score_cols}
+        )
+        scores = scores.sort_values(score_cols[0], ascending=False).reset_index()
+        
+        # Só guarda se os dados não foram trocados durante o cálculo
+        if self.data is data:
+            self._scores_cache = scores
+        
+        return scores
+    
+    def calculate_metrics(self, group_col, metric_col, agg='mean'):
+        """
+        Agrega uma métrica por grupo.
+        
+        Args:
+            group_col (str): Coluna de agrupamento.
+            metric_col (str): Coluna agregada.
+            agg (str): Função de agregação do pandas ('mean', 'sum', ...).
+            
+        Returns:
+            pandas.Series: Métrica agregada por grupo ou None se não houver dados carregados.
+        """
+        data = self.data
+        if data is None:
+            return None
+        
+        key = (group_col, metric_col, agg)
+        cached = self._metrics_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        metrics = data.groupby(group_col, observed=True)[metric_col].agg(agg)
+        
+        if self.data is data:
+            self._metrics_cache[key] = metrics
+        
+        return metrics
     
     def filter_data(self, filters):
         """
         Filtra os dados com base em critérios específicos.
         
         Args:
-            filters (dict): Critérios de filtragem no formato {coluna: valor}.
+            filters (dict): Critérios de filtragem no formato {coluna: valor}; uma
+                lista, tupla ou conjunto como valor seleciona qualquer um dos itens.
             
         Returns:
             pandas.DataFrame: Dados filtrados ou None se não houver dados carregados.
@@ -173,13 +724,68 @@ class DataProcessor:
         if self.data is None:
             return None
         
-        filtered_data = self.data.copy()
+        data = self.data
+        columns = self._columns
         
+        # Combina as comparações em uma única máscara e indexa os dados uma vez só
+        masks = []
         for column, value in filters.items():
-            if column in filtered_data.columns:
-                filtered_data = filtered_data[filtered_data[column] == value]
+            if column not in data.columns:
+                continue
+            
+            values = columns.get(column)
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                # np.isin converte a lista para um único dtype: só é seguro para colunas
+                # numéricas com itens numéricos; nos demais casos (texto, listas mistas)
+                # o Series.isin compara item a item, por hash
+                if values is not None and values.dtype.kind in 'iuf' and all(map(_is_number, value)):
+                    masks.append(np.isin(values, value))
+                else:
+                    masks.append(data[column].isin(value).to_numpy())
+            elif values is None or value is None:
+                # None passa pelo pandas, que (como antes) não o iguala às células vazias
+                masks.append((data[column] == value).to_numpy())
+            else:
+                masks.append(values == value)
+        
+        if not masks:
+            # Sem critérios aplicáveis: cópia rasa (novo objeto, sem duplicar os dados)
+            return data.copy(deep=False)
         
-        return filtered_data
+        return data.iloc[np.flatnonzero(np.logical_and.reduce(masks))]
+    
+    def to_records_c(self, columns=None):
+        """
+        Retorna as colunas numéricas como um array 2D contíguo em ordem de linhas.
+        
+        O pandas guarda os dados por coluna, e to_numpy() costuma devolver um array
+        em ordem de colunas; quem percorre linha a linha acessaria a memória com
+        saltos. Cada coluna é copiada de uma vez para a posição final do array.
+        
+        Args:
+            columns (list, optional): Colunas numéricas a incluir (None para todas).
+            
+        Returns:
+            numpy.ndarray: Array (linhas x colunas) em ordem C ou None se não houver
+                dados carregados.
+        """
+        if self.data is None:
+            return None
+        
+        if columns is None:
+            columns = self.data.select_dtypes(include='number').columns
+        
+        numeric = self.data[columns]
+        if not len(columns):
+            return np.empty((len(numeric), 0))
+        
+        dtype = np.result_type(*numeric.dtypes)
+        records = np.empty((len(numeric), len(columns)), dtype=dtype, order='C')
+        for j, col in enumerate(columns):
+            records[:, j] = numeric[col].to_numpy()
+        
+        return records
     
     def get_column_values(self, column):
         """
@@ -194,7 +800,47 @@ class DataProcessor:
         if self.data is None or column not in self.data.columns:
             return None
         
-        values = self.data[column].unique().tolist()
+        values = self._columns.get(column)
+        values = pd.Series(pd.unique(values) if values is not None else self.data[column].unique())
         
         # Sanitizar os valores antes de retornar
-        return self.sanitize_data(values)
+        return _json_safe(values).tolist()
+    
+    def get_column_data(self, column_name, as_list=False):
+        """
+        Retorna todos os valores de uma coluna.
+        
+        Args:
+            column_name (str): Nome da coluna.
+            as_list (bool): Se True, retorna uma lista Python (ex.: para JSON).
+            
+        Returns:
+            numpy.ndarray ou list: Valores da coluna ou None se a coluna não existir.
+                Colunas numéricas e de data retornam uma visão do array interno
+                (sem cópia); não modificar.
+        """
+        if self.data is None or column_name not in self.data.columns:
+            return None
+        
+        series = self.data[column_name]
+        if as_list or series.dtype == object:
+            return series.tolist()
+        
+        return series.to_numpy(copy=False)
+
+@functools.lru_cache(maxsize=READ_CACHE_SIZE)
+def _cached_read(path, mtime_ns, size, usecols):
+    """
+    Lê e converte uma planilha, memoizado por (caminho, mtime, tamanho, colunas).
+    
+    Args:
+        path (str): Caminho absoluto do arquivo.
+        mtime_ns (int): Data de modificação em nanossegundos (invalida o cache se mudar).
+        size (int): Tamanho do arquivo em bytes.
+        usecols (tuple): Colunas a serem lidas ou None para todas.
+        
+    Returns:
+        pandas.DataFrame: Dados da primeira aba (compartilhado; não modificar).
+    """
+    df = DataProcessor._read_excel(path, usecols=list(usecols) if usecols is not None else None)
+    return DataProcessor._shrink_dtypes(df)
@@ -2,13 +2,33 @@
 Gerador de relatórios Excel para dados de viagens de motoristas.
 """
 
-import os
+import re
+import tempfile
 import xlsxwriter
+from xlsxwriter.utility import xl_range_abs, xl_rowcol_to_cell
 from datetime import datetime
-import json
 import pandas as pd
 import numpy as np
 
+# Buffer de escrita do arquivo de saída (1 MB)
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Largura máxima das colunas das tabelas (em caracteres)
+COLUMN_MAX_WIDTH = 50
+
+# Estatísticas exibidas na aba de estatísticas, na ordem das colunas
+STATS_KEYS = ('mean', 'min', 'max', 'std')
+
+# Número mínimo de linhas para incluir um gráfico (com menos, o gráfico não informa nada)
+CHART_MIN_ROWS = 3
+
+# Colunas de score usadas no gráfico do relatório de scores
+SCORE_RE = re.compile('score', re.IGNORECASE)
+
+def _has_rows(data):
+    """Verifica se o resultado do relatório traz um DataFrame com linhas."""
+    return bool(data) and data.get('data') is not None and len(data['data']) > 0
+
 def generate_excel(data, report_type, output_path):
     """
     Gera um relatório Excel com base nos dados fornecidos.
@@ -18,8 +38,24 @@ def generate_excel(data, report_type, output_path):
         report_type: Tipo de relatório ('motoristas', 'viagens', 'scores', 'geral')
         output_path: Caminho para salvar o Excel
     """
-    # Criar workbook e adicionar worksheets com base no tipo de relatório
-    workbook = xlsxwriter.Workbook(output_path)
+    # Gravar o pacote através de um buffer grande, reduzindo as chamadas de escrita
+    with open(output_path, 'wb', buffering=OUTPUT_BUFFER_SIZE) as output_file:
+        _write_workbook(output_file, data, report_type)
+    
+    return output_path
+
+
+def _write_workbook(output_file, data, report_type):
+    """Monta o workbook do relatório e o grava no arquivo aberto."""
+    # Criar workbook e adicionar worksheets com base no tipo de relatório. Em
+    # constant_memory cada linha é descarregada em um arquivo temporário assim que a
+    # seguinte começa, então a memória não cresce com o número de linhas; todas as
+    # abas escrevem as linhas em ordem crescente, como esse modo exige
+    workbook = xlsxwriter.Workbook(output_file, {
+        'nan_inf_to_errors': True,
+        'constant_memory': True,
+        'tmpdir': tempfile.gettempdir()
+    })
     
     # Definir formatos
     header_format = workbook.add_format({
@@ -51,15 +87,18 @@ def generate_excel(data, report_type, output_path):
         'font_size': 12
     })
     
+    # Data de geração formatada uma única vez para todas as abas
+    generated_at = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+    
     # Adicionar conteúdo com base no tipo de relatório
     if report_type == 'motoristas':
-        _generate_drivers_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format)
+        _generate_drivers_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at)
     elif report_type == 'viagens':
-        _generate_trips_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format)
+        _generate_trips_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at)
     elif report_type == 'scores':
-        _generate_scores_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format)
+        _generate_scores_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at)
     elif report_type == 'geral':
-        _generate_general_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format)
+        _generate_general_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at)
     else:
         # Relatório padrão
         worksheet = workbook.add_worksheet('Relatório')
@@ -67,185 +106,198 @@ def generate_excel(data, report_type, output_path):
     
     # Fechar workbook
     workbook.close()
+
+
+def _is_text(series):
+    """Verifica se uma coluna contém apenas texto (ignorando valores ausentes)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(series.cat.categories, skipna=True) == 'string'
+    return pd.api.types.infer_dtype(series, skipna=True) == 'string'
+
+
+def _write_table(worksheet, df, header_row, header_format, cell_format, number_format):
+    """
+    Escreve um DataFrame como tabela: cabeçalho, linhas, larguras e filtros.
     
-    return output_path
+    Ponto único de escrita das tabelas dos relatórios de motoristas, viagens e scores.
+    
+    Args:
+        worksheet: Worksheet de destino
+        df (pandas.DataFrame): Dados da tabela
+        header_row (int): Linha do cabeçalho (os dados começam na linha seguinte)
+        header_format, cell_format, number_format: Formatos do workbook
+    """
+    columns = list(df.columns)
+    
+    # Escrever cabeçalhos (formato único para a linha inteira)
+    worksheet.write_row(header_row, 0, columns, header_format)
+    
+    # Escolher o método de escrita e o formato uma vez por coluna, pelo dtype: colunas
+    # numéricas vão direto para write_number e colunas de texto para write_string, sem
+    # o teste de tipo do write() a cada célula. Cada coluna é convertida para objetos
+    # Python de uma vez (tolist() em C) e as linhas são montadas com zip; a escrita
+    # continua linha a linha, como o constant_memory exige
+    writers = []
+    column_values = []
+    for column in columns:
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            writers.append((worksheet.write_number, number_format))
+            column_values.append(series.tolist())
+        elif _is_text(series):
+            writers.append((worksheet.write_string, cell_format))
+            # Valores ausentes viram texto vazio (write_string não aceita None/NaN)
+            column_values.append(series.astype(object).where(series.notna(), '').tolist())
+        else:
+            writers.append((worksheet.write, cell_format))
+            column_values.append(series.tolist())
+    
+    # Escrever dados; quando nenhuma coluna tem método específico, todas as células
+    # usam o mesmo formato e cada linha vai em uma única chamada
+    rows = enumerate(zip(*column_values), start=header_row + 1)
+    if all(write == worksheet.write for write, _ in writers):
+        for row_idx, row in rows:
+            worksheet.write_row(row_idx, 0, row, cell_format)
+    else:
+        for row_idx, row in rows:
+            for col_idx, value in enumerate(row):
+                write, cell_fmt = writers[col_idx]
+                write(row_idx, col_idx, value, cell_fmt)
+    
+    # Ajustar largura das colunas ao maior texto (cabeçalho ou valor), com o
+    # comprimento das strings calculado pelo pandas em vez de um len() por célula
+    if len(df):
+        value_widths = df.astype(str).apply(lambda col: col.str.len().max()).to_numpy()
+    else:
+        value_widths = np.zeros(len(columns), dtype=int)
+    header_widths = np.array([len(str(column)) for column in columns])
+    widths = np.clip(np.maximum(value_widths, header_widths) + 2, 12, COLUMN_MAX_WIDTH)
+    
+    for col_idx, width in enumerate(widths):
+        worksheet.set_column(col_idx, col_idx, int(width))
+    
+    # Adicionar filtros
+    worksheet.autofilter(header_row, 0, header_row + len(df), len(columns) - 1)
+
+
+def _insert_top10_chart(workbook, worksheet, chart_type, columns, value_col, num_rows):
+    """
+    Insere o gráfico dos 10 primeiros motoristas de uma tabela escrita por _write_table.
+    
+    Args:
+        workbook: Workbook do relatório
+        worksheet: Worksheet com a tabela (cabeçalho na linha 6)
+        chart_type (str): Tipo de gráfico do xlsxwriter ('column', 'bar')
+        columns (list): Colunas da tabela
+        value_col (int): Índice da coluna de valores
+        num_rows (int): Número de linhas de dados da tabela
+    """
+    chart = workbook.add_chart({'type': chart_type})
+    
+    # Referências absolutas montadas pelo xlsxwriter (cobre colunas além da Z);
+    # cabeçalho na linha de índice 5 e até 10 linhas de dados a partir da 6
+    last_row = 5 + min(10, num_rows)
+    chart.add_series({
+        'name': f'={worksheet.name}!{xl_rowcol_to_cell(5, value_col, row_abs=True, col_abs=True)}',
+        'categories': f'={worksheet.name}!{xl_range_abs(6, 0, last_row, 0)}',
+        'values': f'={worksheet.name}!{xl_range_abs(6, value_col, last_row, value_col)}',
+    })
+    
+    chart.set_title({'name': f'Top 10 Motoristas por {columns[value_col]}'})
+    chart.set_x_axis({'name': 'Motorista'})
+    chart.set_y_axis({'name': columns[value_col]})
+    
+    worksheet.insert_chart('A20', chart, {'x_scale': 1.5, 'y_scale': 1})
 
 
-def _generate_drivers_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format):
+def _generate_drivers_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at):
     """Gera relatório Excel de motoristas."""
     # Criar worksheet
     worksheet = workbook.add_worksheet('Motoristas')
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         worksheet.write(0, 0, 'Não há dados disponíveis para este relatório.', title_format)
         return
     
     # Extrair dados
     drivers_data = data['data']
-    columns = data.get('columns', [])
+    columns = list(drivers_data.columns)
     
     # Título
     worksheet.write(0, 0, 'Relatório de Motoristas', title_format)
-    worksheet.write(1, 0, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}')
+    worksheet.write(1, 0, f'Gerado em: {generated_at}')
     worksheet.write(3, 0, 'Análise de Motoristas', subtitle_format)
     
-    # Escrever cabeçalhos
-    for col_idx, column in enumerate(columns):
-        worksheet.write(5, col_idx, column, header_format)
-    
-    # Escrever dados
-    for row_idx, driver in enumerate(drivers_data):
-        for col_idx, column in enumerate(columns):
-            value = driver.get(column, '')
-            
-            # Formatar valores numéricos
-            if isinstance(value, (int, float)):
-                worksheet.write(row_idx + 6, col_idx, value, number_format)
-            else:
-                worksheet.write(row_idx + 6, col_idx, value, cell_format)
-    
-    # Ajustar largura das colunas
-    for col_idx, column in enumerate(columns):
-        worksheet.set_column(col_idx, col_idx, max(len(column) + 2, 12))
-    
-    # Adicionar filtros
-    worksheet.autofilter(5, 0, 5 + len(drivers_data), len(columns) - 1)
+    # Cabeçalhos, dados, larguras e filtros
+    _write_table(worksheet, drivers_data, 5, header_format, cell_format, number_format)
     
     # Adicionar gráfico (exemplo)
-    if len(drivers_data) > 0 and len(columns) > 1:
-        chart = workbook.add_chart({'type': 'column'})
-        
-        # Encontrar coluna numérica para o gráfico
-        numeric_col = None
-        for col_idx, column in enumerate(columns):
-            if col_idx > 0:  # Pular a primeira coluna (nome do motorista)
-                sample_value = drivers_data[0].get(column, '')
-                if isinstance(sample_value, (int, float)):
-                    numeric_col = col_idx
-                    break
+    if len(drivers_data) >= CHART_MIN_ROWS and len(columns) > 1:
+        # Encontrar coluna numérica para o gráfico pelos dtypes, pulando a primeira
+        # coluna (nome do motorista)
+        numeric_col = next(
+            (col_idx for col_idx, dtype in enumerate(drivers_data.dtypes)
+             if col_idx > 0 and pd.api.types.is_numeric_dtype(dtype)),
+            None
+        )
         
         if numeric_col is not None:
-            chart.add_series({
-                'name': f'={worksheet.name}!${chr(65 + numeric_col)}$6',
-                'categories': f'={worksheet.name}!$A$7:$A${6 + min(10, len(drivers_data))}',
-                'values': f'={worksheet.name}!${chr(65 + numeric_col)}$7:${chr(65 + numeric_col)}${6 + min(10, len(drivers_data))}',
-            })
-            
-            chart.set_title({'name': f'Top 10 Motoristas por {columns[numeric_col]}'})
-            chart.set_x_axis({'name': 'Motorista'})
-            chart.set_y_axis({'name': columns[numeric_col]})
-            
-            worksheet.insert_chart('A20', chart, {'x_scale': 1.5, 'y_scale': 1})
+            _insert_top10_chart(workbook, worksheet, 'column', columns, numeric_col, len(drivers_data))
 
 
-def _generate_trips_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format):
+def _generate_trips_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at):
     """Gera relatório Excel de viagens."""
     # Criar worksheet
     worksheet = workbook.add_worksheet('Viagens')
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         worksheet.write(0, 0, 'Não há dados disponíveis para este relatório.', title_format)
         return
     
     # Extrair dados
     trips_data = data['data']
-    columns = data.get('columns', [])
     
     # Título
     worksheet.write(0, 0, 'Relatório de Viagens', title_format)
-    worksheet.write(1, 0, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}')
+    worksheet.write(1, 0, f'Gerado em: {generated_at}')
     worksheet.write(3, 0, 'Análise de Viagens', subtitle_format)
     
-    # Escrever cabeçalhos
-    for col_idx, column in enumerate(columns):
-        worksheet.write(5, col_idx, column, header_format)
-    
-    # Escrever dados
-    for row_idx, trip in enumerate(trips_data):
-        for col_idx, column in enumerate(columns):
-            value = trip.get(column, '')
-            
-            # Formatar valores numéricos
-            if isinstance(value, (int, float)):
-                worksheet.write(row_idx + 6, col_idx, value, number_format)
-            else:
-                worksheet.write(row_idx + 6, col_idx, value, cell_format)
-    
-    # Ajustar largura das colunas
-    for col_idx, column in enumerate(columns):
-        worksheet.set_column(col_idx, col_idx, max(len(column) + 2, 12))
-    
-    # Adicionar filtros
-    worksheet.autofilter(5, 0, 5 + len(trips_data), len(columns) - 1)
+    # Cabeçalhos, dados, larguras e filtros
+    _write_table(worksheet, trips_data, 5, header_format, cell_format, number_format)
 
 
-def _generate_scores_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format):
+def _generate_scores_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at):
     """Gera relatório Excel de scores de motoristas."""
     # Criar worksheet
     worksheet = workbook.add_worksheet('Scores')
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         worksheet.write(0, 0, 'Não há dados disponíveis para este relatório.', title_format)
         return
     
     # Extrair dados
     scores_data = data['data']
-    columns = data.get('columns', [])
+    columns = list(scores_data.columns)
     
     # Título
     worksheet.write(0, 0, 'Relatório de Scores de Motoristas', title_format)
-    worksheet.write(1, 0, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}')
+    worksheet.write(1, 0, f'Gerado em: {generated_at}')
     worksheet.write(3, 0, 'Análise de Scores', subtitle_format)
     
-    # Escrever cabeçalhos
-    for col_idx, column in enumerate(columns):
-        worksheet.write(5, col_idx, column, header_format)
-    
-    # Escrever dados
-    for row_idx, score in enumerate(scores_data):
-        for col_idx, column in enumerate(columns):
-            value = score.get(column, '')
-            
-            # Formatar valores numéricos
-            if isinstance(value, (int, float)):
-                worksheet.write(row_idx + 6, col_idx, value, number_format)
-            else:
-                worksheet.write(row_idx + 6, col_idx, value, cell_format)
-    
-    # Ajustar largura das colunas
-    for col_idx, column in enumerate(columns):
-        worksheet.set_column(col_idx, col_idx, max(len(column) + 2, 12))
-    
-    # Adicionar filtros
-    worksheet.autofilter(5, 0, 5 + len(scores_data), len(columns) - 1)
+    # Cabeçalhos, dados, larguras e filtros
+    _write_table(worksheet, scores_data, 5, header_format, cell_format, number_format)
     
     # Adicionar gráfico de scores (se houver coluna de score)
-    score_col = None
-    for col_idx, column in enumerate(columns):
-        if 'score' in column.lower():
-            score_col = col_idx
-            break
-    
-    if score_col is not None and len(scores_data) > 0:
-        chart = workbook.add_chart({'type': 'bar'})
-        
-        chart.add_series({
-            'name': f'={worksheet.name}!${chr(65 + score_col)}$6',
-            'categories': f'={worksheet.name}!$A$7:$A${6 + min(10, len(scores_data))}',
-            'values': f'={worksheet.name}!${chr(65 + score_col)}$7:${chr(65 + score_col)}${6 + min(10, len(scores_data))}',
-        })
-        
-        chart.set_title({'name': f'Top 10 Motoristas por {columns[score_col]}'})
-        chart.set_x_axis({'name': 'Motorista'})
-        chart.set_y_axis({'name': columns[score_col]})
-        
-        worksheet.insert_chart('A20', chart, {'x_scale': 1.5, 'y_scale': 1})
+    score_col = next((col_idx for col_idx, column in enumerate(columns) if SCORE_RE.search(str(column))), None)
+    
+    if score_col is not None and len(scores_data) >= CHART_MIN_ROWS:
+        _insert_top10_chart(workbook, worksheet, 'bar', columns, score_col, len(scores_data))
 
 
-def _generate_general_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format):
+def _generate_general_excel(workbook, data, header_format, cell_format, number_format, title_format, subtitle_format, generated_at):
     """Gera relatório Excel geral com estatísticas."""
     # Criar worksheets
     info_sheet = workbook.add_worksheet('Informações Gerais')
@@ -262,7 +314,7 @@ def _generate_general_excel(workbook, data, header_format, cell_format, number_f
     
     # === Informações Gerais ===
     info_sheet.write(0, 0, 'Relatório Geral de Dados', title_format)
-    info_sheet.write(1, 0, f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}')
+    info_sheet.write(1, 0, f'Gerado em: {generated_at}')
     
     # Informações básicas
     info_sheet.write(3, 0, 'Informações Básicas', subtitle_format)
@@ -313,14 +365,12 @@ def _generate_general_excel(workbook, data, header_format, cell_format, number_f
         stats_sheet.write(2, 3, 'Máximo', header_format)
         stats_sheet.write(2, 4, 'Desvio Padrão', header_format)
         
-        # Dados
+        # Dados: nome da coluna e as quatro estatísticas em uma chamada por linha
+        # (valores ausentes chegam como None e ficam em branco)
         row_idx = 3
         for col, stats in numeric_stats.items():
-            stats_sheet.write(row_idx, 0, col, cell_format)
-            stats_sheet.write(row_idx, 1, stats.get('mean', 'N/A'), number_format)
-            stats_sheet.write(row_idx, 2, stats.get('min', 'N/A'), number_format)
-            stats_sheet.write(row_idx, 3, stats.get('max', 'N/A'), number_format)
-            stats_sheet.write(row_idx, 4, stats.get('std', 'N/A'), number_format)
+            stats_sheet.write_string(row_idx, 0, str(col), cell_format)
+            stats_sheet.write_row(row_idx, 1, [stats.get(key) for key in STATS_KEYS], number_format)
             row_idx += 1
         
         # Ajustar largura das colunas
@@ -356,16 +406,18 @@ def _generate_general_excel(workbook, data, header_format, cell_format, number_f
         for col_idx, header in enumerate(headers):
             sample_sheet.write(2, col_idx, header, header_format)
         
+        # Alinhar cada registro aos cabeçalhos uma única vez (map em C, sem um get()
+        # por célula no laço de escrita); chaves ausentes viram células vazias
+        rows = [tuple(map(record.get, headers)) for record in sample]
+        
         # Escrever dados
-        for row_idx, row in enumerate(sample):
-            for col_idx, header in enumerate(headers):
-                value = row.get(header, '')
-                
+        for row_idx, row in enumerate(rows, start=3):
+            for col_idx, value in enumerate(row):
                 # Formatar valores numéricos
                 if isinstance(value, (int, float)):
-                    sample_sheet.write(row_idx + 3, col_idx, value, number_format)
+                    sample_sheet.write(row_idx, col_idx, value, number_format)
                 else:
-                    sample_sheet.write(row_idx + 3, col_idx, value, cell_format)
+                    sample_sheet.write(row_idx, col_idx, value, cell_format)
         
         # Ajustar largura das colunas
         for col_idx, header in enumerate(headers):
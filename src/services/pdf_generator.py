@@ -2,12 +2,27 @@
 Gerador de relatórios PDF para dados de viagens de motoristas.
 """
 
-import os
-from fpdf2 import FPDF
+from fpdf import FPDF
 from datetime import datetime
-import json
-import pandas as pd
-import numpy as np
+
+# Formato dos valores decimais e tamanho máximo do texto de uma célula das tabelas
+FLOAT_FORMAT = '%.2f'
+CELL_MAX_LEN = 20
+
+def _cell_text(value):
+    """Formata o valor de uma célula de tabela, truncando textos longos."""
+    if isinstance(value, float):
+        text = FLOAT_FORMAT % value
+    else:
+        text = str(value)
+    
+    if len(text) > CELL_MAX_LEN:
+        text = text[:CELL_MAX_LEN - 3] + "..."
+    return text
+
+def _has_rows(data):
+    """Verifica se o resultado do relatório traz um DataFrame com linhas."""
+    return bool(data) and data.get('data') is not None and len(data['data']) > 0
 
 class ReportPDF(FPDF):
     """Classe personalizada para geração de relatórios PDF."""
@@ -15,6 +30,8 @@ class ReportPDF(FPDF):
     def __init__(self, title="Relatório"):
         super().__init__()
         self.title = title
+        # Data de geração fixada na criação, em vez de formatada a cada página
+        self.generated_at = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         # Configurar fonte padrão
         self.set_auto_page_break(auto=True, margin=15)
         
@@ -30,7 +47,7 @@ class ReportPDF(FPDF):
         # Data e hora
         self.set_font('helvetica', 'I', 8)
         self.set_text_color(128)
-        self.cell(0, 5, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", 0, 1, 'R')
+        self.cell(0, 5, f"Gerado em: {self.generated_at}", 0, 1, 'R')
         
         # Linha separadora
         self.ln(5)
@@ -82,23 +99,13 @@ class ReportPDF(FPDF):
         self.set_text_color(0)
         self.set_font('helvetica', '', 10)
         
+        # Formatar todas as células antes de desenhar; o laço abaixo só chama cell()
+        rendered = [[_cell_text(cell) for cell in row] for row in data]
+        
         fill = False
-        for row in data:
-            for i, cell in enumerate(row):
-                # Formatar valores numéricos
-                if isinstance(cell, (int, float)):
-                    if isinstance(cell, int):
-                        cell_text = str(cell)
-                    else:
-                        cell_text = f"{cell:.2f}"
-                else:
-                    cell_text = str(cell)
-                
-                # Limitar tamanho do texto
-                if len(cell_text) > 20:
-                    cell_text = cell_text[:17] + "..."
-                
-                self.cell(col_widths[i], 6, cell_text, 1, 0, 'L', fill)
+        for row in rendered:
+            for width, cell_text in zip(col_widths, row):
+                self.cell(width, 6, cell_text, 1, 0, 'L', fill)
             self.ln()
             fill = not fill
         
@@ -176,19 +183,19 @@ def _generate_drivers_report(pdf, data):
     pdf.ln(5)
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         pdf.chapter_body('Não há dados disponíveis para este relatório.')
         return
     
     # Extrair dados
     drivers_data = data['data']
-    columns = data.get('columns', [])
+    columns = list(drivers_data.columns)
     
     # Limitar número de motoristas para o relatório
     max_drivers = 20
     if len(drivers_data) > max_drivers:
         pdf.chapter_body(f'Mostrando os primeiros {max_drivers} motoristas de um total de {len(drivers_data)}.')
-        drivers_data = drivers_data[:max_drivers]
+        drivers_data = drivers_data.head(max_drivers)
     
     # Selecionar colunas relevantes
     relevant_cols = []
@@ -208,12 +215,7 @@ def _generate_drivers_report(pdf, data):
     
     # Preparar dados para a tabela
     table_headers = relevant_cols
-    table_data = []
-    for driver in drivers_data:
-        row = []
-        for col in relevant_cols:
-            row.append(driver.get(col, ''))
-        table_data.append(row)
+    table_data = list(drivers_data[relevant_cols].itertuples(index=False, name=None))
     
     # Adicionar tabela
     pdf.chapter_title('Dados dos Motoristas')
@@ -237,28 +239,23 @@ def _generate_trips_report(pdf, data):
     pdf.ln(5)
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         pdf.chapter_body('Não há dados disponíveis para este relatório.')
         return
     
     # Extrair dados
     trips_data = data['data']
-    columns = data.get('columns', [])
+    columns = list(trips_data.columns)
     
     # Limitar número de viagens para o relatório
     max_trips = 20
     if len(trips_data) > max_trips:
         pdf.chapter_body(f'Mostrando as primeiras {max_trips} viagens de um total de {len(trips_data)}.')
-        trips_data = trips_data[:max_trips]
+        trips_data = trips_data.head(max_trips)
     
     # Preparar dados para a tabela
     table_headers = columns[:min(5, len(columns))]  # Limitar a 5 colunas
-    table_data = []
-    for trip in trips_data:
-        row = []
-        for col in table_headers:
-            row.append(trip.get(col, ''))
-        table_data.append(row)
+    table_data = list(trips_data.iloc[:, :len(table_headers)].itertuples(index=False, name=None))
     
     # Adicionar tabela
     pdf.chapter_title('Dados das Viagens')
@@ -282,19 +279,19 @@ def _generate_scores_report(pdf, data):
     pdf.ln(5)
     
     # Verificar se há dados
-    if not data or 'data' not in data or not data['data']:
+    if not _has_rows(data):
         pdf.chapter_body('Não há dados disponíveis para este relatório.')
         return
     
     # Extrair dados
     scores_data = data['data']
-    columns = data.get('columns', [])
+    columns = list(scores_data.columns)
     
     # Limitar número de motoristas para o relatório
     max_drivers = 20
     if len(scores_data) > max_drivers:
         pdf.chapter_body(f'Mostrando os primeiros {max_drivers} motoristas de um total de {len(scores_data)}.')
-        scores_data = scores_data[:max_drivers]
+        scores_data = scores_data.head(max_drivers)
     
     # Selecionar colunas relevantes
     relevant_cols = []
@@ -314,12 +311,7 @@ def _generate_scores_report(pdf, data):
     
     # Preparar dados para a tabela
     table_headers = relevant_cols
-    table_data = []
-    for driver in scores_data:
-        row = []
-        for col in relevant_cols:
-            row.append(driver.get(col, ''))
-        table_data.append(row)
+    table_data = list(scores_data[relevant_cols].itertuples(index=False, name=None))
     
     # Adicionar tabela
     pdf.chapter_title('Scores dos Motoristas')
@@ -352,11 +344,13 @@ def _generate_general_report(pdf, data):
     
     # Informações gerais
     pdf.chapter_title('Informações Gerais')
+    memory_usage = metadata.get('memory_usage')
+    memory_text = f"{FLOAT_FORMAT % memory_usage} MB" if isinstance(memory_usage, (int, float)) else 'N/A'
     info_text = f"""
-    • Número de registros: {metadata.get('num_rows', 'N/A')}
-    • Número de colunas: {metadata.get('num_columns', 'N/A')}
-    • Tamanho em memória: {metadata.get('memory_usage', 'N/A'):.2f} MB
-    • Arquivo: {metadata.get('file_name', 'N/A')}
+    - Número de registros: {metadata.get('num_rows', 'N/A')}
+    - Número de colunas: {metadata.get('num_columns', 'N/A')}
+    - Tamanho em memória: {memory_text}
+    - Arquivo: {metadata.get('file_name', 'N/A')}
     """
     pdf.chapter_body(info_text)
     pdf.ln(5)
@@ -369,7 +363,7 @@ def _generate_general_report(pdf, data):
     col_text = ""
     for col in columns:
         col_type = column_types.get(col, 'desconhecido')
-        col_text += f"• {col} (tipo: {col_type})\n"
+        col_text += f"- {col} (tipo: {col_type})\n"
     
     pdf.chapter_body(col_text)
     pdf.ln(5)
@@ -401,19 +395,24 @@ def _generate_general_report(pdf, data):
         pdf.chapter_title('Estatísticas Resumidas')
         
         numeric_stats = data['summary']['numeric']
-        for col, stats in numeric_stats.items():
-            pdf.set_font('helvetica', 'B', 11)
-            pdf.cell(0, 6, f"Coluna: {col}", 0, 1)
-            pdf.set_font('helvetica', '', 10)
-            
-            stats_text = f"""
-            • Média: {stats.get('mean', 'N/A'):.2f}
-            • Mínimo: {stats.get('min', 'N/A'):.2f}
-            • Máximo: {stats.get('max', 'N/A'):.2f}
-            • Desvio Padrão: {stats.get('std', 'N/A'):.2f}
-            """
-            pdf.multi_cell(0, 5, stats_text)
-            pdf.ln(3)
+        
+        def fmt(value):
+            return FLOAT_FORMAT % value if isinstance(value, (int, float)) else 'N/A'
+        
+        # Montar a seção inteira como um único texto e diagramá-la em uma só chamada
+        stats_text = "\n\n".join(
+            f"Coluna: {col}\n"
+            f"  - Média: {fmt(stats.get('mean'))}\n"
+            f"  - Mínimo: {fmt(stats.get('min'))}\n"
+            f"  - Máximo: {fmt(stats.get('max'))}\n"
+            f"  - Desvio Padrão: {fmt(stats.get('std'))}"
+            for col, stats in numeric_stats.items()
+        )
+        
+        pdf.set_font('helvetica', '', 10)
+        pdf.set_text_color(0)
+        pdf.multi_cell(0, 5, stats_text)
+        pdf.ln(3)
     
     # Adicionar placeholder para gráfico
     pdf.add_chart_placeholder(
@@ -5,10 +5,17 @@ Módulo para criar diretórios necessários e renderizar templates.
 import os
 from flask import render_template, send_from_directory
 
+# Marca que os diretórios já foram criados neste processo
+_SETUP_DONE = False
+
 def setup_directories():
     """
     Cria os diretórios necessários para a aplicação.
     """
+    global _SETUP_DONE
+    if _SETUP_DONE:
+        return True
+
     # Diretório base da aplicação
     base_dir = os.path.dirname(os.path.dirname(__file__))
     
@@ -25,16 +32,19 @@ def setup_directories():
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
     
+    _SETUP_DONE = True
     return True
 
+# Templates não aparecem nem somem em tempo de execução: verificar uma vez só
+_HAS_INDEX_TEMPLATE = os.path.exists(
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'index.html')
+)
+
 def render_index():
     """
     Renderiza o template index.html ou retorna o arquivo estático.
     """
-    # Verificar se existe o template
-    template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'index.html')
-    
-    if os.path.exists(template_path):
+    if _HAS_INDEX_TEMPLATE:
         return render_template('index.html')
     else:
         # Se não existir o template, usar o arquivo estático
@@ -6,179 +6,322 @@ para testar o sistema com um grande volume de dados (300 mil registros).
 
 import pandas as pd
 import numpy as np
-import random
+import functools
+import itertools
 from datetime import datetime, timedelta
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_test_data(num_records=300000, output_file='dados_teste_frota.xlsx'):
+try:
+    import xlsxwriter
+except ImportError:  # Sem o xlsxwriter, grava com o openpyxl em modo write-only
+    xlsxwriter = None
+
+try:
+    import polars as pl
+except ImportError:  # Sem o Polars, o Parquet é gravado pelo pandas
+    pl = None
+
+# Grupos de linhas do Parquet: vários grupos permitem que PyArrow/Polars leiam em paralelo
+PARQUET_ROW_GROUP_SIZE = 50_000
+
+# Processos usados na geração e número mínimo de registros para dividir o trabalho
+# (abaixo disso, iniciar os processos custa mais do que gerar tudo em um só)
+GENERATION_WORKERS = os.cpu_count() or 1
+PARALLEL_MIN_RECORDS = 100_000
+
+# Definir nomes de motoristas
+NOMES = [
+    "João Silva", "Maria Santos", "Pedro Oliveira", "Ana Costa", "Carlos Pereira",
+    "Luiza Fernandes", "Ricardo Almeida", "Juliana Martins", "Fernando Souza", 
+    "Mariana Lima", "Antônio Rodrigues", "Patrícia Gomes", "Lucas Ribeiro", 
+    "Camila Carvalho", "Roberto Barbosa", "Daniela Nascimento", "Marcos Alves",
+    "Cristina Mendes", "Paulo Castro", "Beatriz Cardoso", "José Correia",
+    "Amanda Teixeira", "Gustavo Ferreira", "Larissa Moreira", "Eduardo Nunes",
+    "Vanessa Rocha", "Marcelo Dias", "Bianca Ramos", "Fábio Freitas", "Letícia Vieira"
+]
+
+# Definir cidades
+CIDADES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Salvador",
+    "Fortaleza", "Recife", "Porto Alegre", "Curitiba", "Manaus", "Belém",
+    "Goiânia", "Guarulhos", "Campinas", "São Luís", "São Gonçalo", "Maceió",
+    "Duque de Caxias", "Natal", "Teresina", "São Bernardo do Campo", "Campo Grande",
+    "Osasco", "Santo André", "João Pessoa", "Jaboatão dos Guararapes", "Contagem"
+]
+
+# Definir tipos de veículos
+VEICULOS = [
+    "Caminhão Baú", "Caminhão Tanque", "Caminhão Frigorífico", "Van de Carga",
+    "Caminhão Graneleiro", "Caminhão Basculante", "Caminhão Guincho", "Caminhão Plataforma",
+    "Caminhão Compactador", "Caminhão Betoneira"
+]
+
+# Definir tipos de eventos
+EVENTOS = [
+    "Freada Brusca", "Excesso de Velocidade", "Desvio de Rota", "Parada Não Autorizada",
+    "Tempo de Descanso Insuficiente", "Uso Indevido do Veículo", "Aceleração Brusca",
+    "Curva Acentuada", "Condução Noturna Prolongada", "Manutenção Atrasada"
+]
+
+# Definir tipos de carga
+TIPOS_CARGA = ['Alimentos', 'Eletrônicos', 'Vestuário', 'Construção', 'Químicos']
+
+def generate_test_data(num_records=300000, output_file='dados_teste_frota.xlsx', file_format='xlsx'):
     """
     Gera dados de teste para validação de performance.
     
     Args:
         num_records: Número de registros a serem gerados
         output_file: Nome do arquivo de saída
+        file_format: 'xlsx' (planilha aceita pelo upload da aplicação) ou 'parquet'
+            (gravação colunar binária, muito mais rápida, para uso programático)
     
     Returns:
         str: Caminho do arquivo gerado
     """
     print(f"Gerando {num_records} registros de teste...")
     
-    # Definir nomes de motoristas
-    nomes = [
-        "João Silva", "Maria Santos", "Pedro Oliveira", "Ana Costa", "Carlos Pereira",
-        "Luiza Fernandes", "Ricardo Almeida", "Juliana Martins", "Fernando Souza", 
-        "Mariana Lima", "Antônio Rodrigues", "Patrícia Gomes", "Lucas Ribeiro", 
-        "Camila Carvalho", "Roberto Barbosa", "Daniela Nascimento", "Marcos Alves",
-        "Cristina Mendes", "Paulo Castro", "Beatriz Cardoso", "José Correia",
-        "Amanda Teixeira", "Gustavo Ferreira", "Larissa Moreira", "Eduardo Nunes",
-        "Vanessa Rocha", "Marcelo Dias", "Bianca Ramos", "Fábio Freitas", "Letícia Vieira"
-    ]
-    
-    # Definir cidades
-    cidades = [
-        "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Brasília", "Salvador",
-        "Fortaleza", "Recife", "Porto Alegre", "Curitiba", "Manaus", "Belém",
-        "Goiânia", "Guarulhos", "Campinas", "São Luís", "São Gonçalo", "Maceió",
-        "Duque de Caxias", "Natal", "Teresina", "São Bernardo do Campo", "Campo Grande",
-        "Osasco", "Santo André", "João Pessoa", "Jaboatão dos Guararapes", "Contagem"
-    ]
-    
-    # Definir tipos de veículos
-    veiculos = [
-        "Caminhão Baú", "Caminhão Tanque", "Caminhão Frigorífico", "Van de Carga",
-        "Caminhão Graneleiro", "Caminhão Basculante", "Caminhão Guincho", "Caminhão Plataforma",
-        "Caminhão Compactador", "Caminhão Betoneira"
-    ]
-    
-    # Definir placas de veículos
-    def gerar_placa():
-        letras = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
-        numeros = ''.join(random.choices('0123456789', k=4))
-        return f"{letras}-{numeros}"
-    
-    placas = [gerar_placa() for _ in range(100)]
-    
-    # Definir tipos de eventos
-    eventos = [
-        "Freada Brusca", "Excesso de Velocidade", "Desvio de Rota", "Parada Não Autorizada",
-        "Tempo de Descanso Insuficiente", "Uso Indevido do Veículo", "Aceleração Brusca",
-        "Curva Acentuada", "Condução Noturna Prolongada", "Manutenção Atrasada"
-    ]
+    # Sementes independentes para cada bloco, derivadas de uma única SeedSequence
+    seed_seq = np.random.SeedSequence()
+    rng = np.random.default_rng(seed_seq)
+    
+    # Definir placas de veículos: 100 placas no formato ABC-1234, com os caracteres
+    # sorteados em matrizes e as colunas concatenadas com np.char.add
+    letras = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))[rng.integers(0, 26, (100, 3))]
+    numeros = np.array(list('0123456789'))[rng.integers(0, 10, (100, 4))]
+    placas = np.char.add(
+        np.char.add(functools.reduce(np.char.add, letras.T), '-'),
+        functools.reduce(np.char.add, numeros.T)
+    )
+    # Categorias precisam ser únicas (descarta placas sorteadas em duplicidade)
+    placas = np.unique(placas)
     
     # Gerar data inicial (1 ano atrás)
-    data_inicial = datetime.now() - timedelta(days=365)
+    data_inicial = np.datetime64(datetime.now() - timedelta(days=365), 'us')
+    
+    # Os registros são independentes: acima do limite, dividir em blocos gerados em
+    # processos separados e concatenar as colunas no final
+    num_blocos = GENERATION_WORKERS if num_records >= PARALLEL_MIN_RECORDS else 1
+    base, resto = divmod(num_records, num_blocos)
+    tamanhos = [base + (i < resto) for i in range(num_blocos)]
+    sementes = seed_seq.spawn(num_blocos)
+    
+    if num_blocos == 1:
+        partes = [_gerar_bloco(tamanhos[0], sementes[0], len(placas), data_inicial)]
+    else:
+        with ProcessPoolExecutor(max_workers=num_blocos) as executor:
+            partes = list(executor.map(
+                _gerar_bloco, tamanhos, sementes,
+                itertools.repeat(len(placas)), itertools.repeat(data_inicial)
+            ))
     
-    # Criar listas para armazenar os dados
+    colunas = {chave: np.concatenate([parte[chave] for parte in partes]) for chave in partes[0]}
+    
+    # Montar as colunas; os índices sorteados viram direto os códigos das colunas
+    # categóricas, e as strings ficam guardadas uma vez só nas categorias
+    # Tipos numéricos compactos: metade da memória das colunas float64/int64
     dados = {
-        'id_viagem': range(1, num_records + 1),
-        'motorista': [random.choice(nomes) for _ in range(num_records)],
-        'data_saida': [],
-        'data_chegada': [],
-        'origem': [],
-        'destino': [],
-        'veiculo': [random.choice(veiculos) for _ in range(num_records)],
-        'placa': [random.choice(placas) for _ in range(num_records)],
-        'distancia_km': [],
-        'tempo_viagem_horas': [],
-        'consumo_combustivel_litros': [],
-        'custo_combustivel': [],
-        'velocidade_media_kmh': [],
-        'carga_kg': [],
-        'tipo_carga': ['Alimentos', 'Eletrônicos', 'Vestuário', 'Construção', 'Químicos'],
-        'eventos_registrados': [],
-        'num_paradas': [],
-        'tempo_paradas_horas': [],
-        'score_seguranca': [],
-        'score_eficiencia': [],
-        'score_geral': []
+        'id_viagem': np.arange(1, num_records + 1, dtype=np.int32),
+        'motorista': pd.Categorical.from_codes(colunas['motorista'], categories=NOMES),
+        'data_saida': colunas['data_saida'],
+        'data_chegada': colunas['data_chegada'],
+        'origem': pd.Categorical.from_codes(colunas['origem'], categories=CIDADES),
+        'destino': pd.Categorical.from_codes(colunas['destino'], categories=CIDADES),
+        'veiculo': pd.Categorical.from_codes(colunas['veiculo'], categories=VEICULOS),
+        'placa': pd.Categorical.from_codes(colunas['placa'], categories=placas),
+        'distancia_km': colunas['distancia_km'],
+        'tempo_viagem_horas': colunas['tempo_viagem_horas'],
+        'consumo_combustivel_litros': colunas['consumo_combustivel_litros'],
+        'custo_combustivel': colunas['custo_combustivel'],
+        'velocidade_media_kmh': colunas['velocidade_media_kmh'],
+        'carga_kg': colunas['carga_kg'],
+        'tipo_carga': pd.Categorical.from_codes(colunas['tipo_carga'], categories=TIPOS_CARGA),
+        'eventos_registrados': pd.Categorical(colunas['eventos_registrados']),
+        'num_paradas': colunas['num_paradas'],
+        'tempo_paradas_horas': colunas['tempo_paradas_horas'],
+        'score_seguranca': colunas['score_seguranca'],
+        'score_eficiencia': colunas['score_eficiencia'],
+        'score_geral': colunas['score_geral']
     }
     
-    # Gerar dados aleatórios
-    for i in range(num_records):
-        # Gerar datas de saída e chegada
-        dias_aleatorios = random.randint(0, 364)
-        data_saida = data_inicial + timedelta(days=dias_aleatorios)
-        duracao_horas = random.uniform(1, 72)  # Entre 1 hora e 3 dias
-        data_chegada = data_saida + timedelta(hours=duracao_horas)
-        
-        dados['data_saida'].append(data_saida)
-        dados['data_chegada'].append(data_chegada)
-        
-        # Origem e destino
-        origem = random.choice(cidades)
-        destino = random.choice([c for c in cidades if c != origem])
-        dados['origem'].append(origem)
-        dados['destino'].append(destino)
-        
-        # Distância e tempo
-        distancia = random.uniform(50, 2000)  # Entre 50 e 2000 km
-        dados['distancia_km'].append(distancia)
-        dados['tempo_viagem_horas'].append(duracao_horas)
-        
-        # Velocidade média
-        velocidade_media = distancia / duracao_horas
-        dados['velocidade_media_kmh'].append(velocidade_media)
-        
-        # Consumo e custo de combustível
-        consumo_medio = random.uniform(2.5, 5.0)  # Litros por km
-        consumo_total = distancia * consumo_medio
-        dados['consumo_combustivel_litros'].append(consumo_total)
-        
-        preco_combustivel = random.uniform(4.5, 6.5)  # Preço por litro
-        custo_combustivel = consumo_total * preco_combustivel
-        dados['custo_combustivel'].append(custo_combustivel)
-        
-        # Carga
-        dados['carga_kg'].append(random.uniform(500, 25000))
-        dados['tipo_carga'].append(random.choice(['Alimentos', 'Eletrônicos', 'Vestuário', 'Construção', 'Químicos']))
-        
-        # Eventos
-        num_eventos = random.choices([0, 1, 2, 3, 4, 5], weights=[0.6, 0.2, 0.1, 0.05, 0.03, 0.02])[0]
-        if num_eventos > 0:
-            eventos_viagem = random.sample(eventos, num_eventos)
-            dados['eventos_registrados'].append(', '.join(eventos_viagem))
-        else:
-            dados['eventos_registrados'].append('')
-        
-        # Paradas
-        num_paradas = int(duracao_horas / 4) + random.randint(0, 3)
-        dados['num_paradas'].append(num_paradas)
-        
-        tempo_paradas = random.uniform(0.25, 0.5) * num_paradas
-        dados['tempo_paradas_horas'].append(tempo_paradas)
-        
-        # Scores
-        # Quanto menos eventos, melhor o score de segurança
-        score_seguranca = 100 - (num_eventos * 15) + random.uniform(-5, 5)
-        score_seguranca = max(0, min(100, score_seguranca))
-        dados['score_seguranca'].append(score_seguranca)
-        
-        # Eficiência baseada em consumo e velocidade
-        score_eficiencia = 100 - (consumo_medio - 2.5) * 20 + (velocidade_media / 10) + random.uniform(-10, 10)
-        score_eficiencia = max(0, min(100, score_eficiencia))
-        dados['score_eficiencia'].append(score_eficiencia)
-        
-        # Score geral
-        score_geral = (score_seguranca * 0.6) + (score_eficiencia * 0.4) + random.uniform(-5, 5)
-        score_geral = max(0, min(100, score_geral))
-        dados['score_geral'].append(score_geral)
-        
-        # Mostrar progresso
-        if (i + 1) % 50000 == 0 or i + 1 == num_records:
-            print(f"Gerados {i + 1} de {num_records} registros ({((i + 1) / num_records) * 100:.1f}%)")
+    print(f"Gerados {num_records} registros")
     
-    # Criar DataFrame
-    df = pd.DataFrame(dados)
+    # Criar DataFrame sem copiar os arrays já tipados
+    df = pd.DataFrame(dados, copy=False)
     
-    # Salvar em Excel
     print(f"Salvando dados em {output_file}...")
-    df.to_excel(output_file, index=False)
+    if file_format == 'parquet':
+        _write_parquet(df, output_file)
+    elif xlsxwriter is None:
+        _write_excel_openpyxl(df, output_file)
+    else:
+        # Salvar em Excel direto com o xlsxwriter, sem o formatador célula a célula do
+        # pandas: as colunas viram listas Python de uma vez e as linhas são gravadas em
+        # ordem, o que permite o constant_memory (cada linha vai para o disco em seguida)
+        workbook = xlsxwriter.Workbook(output_file, {
+            'constant_memory': True,
+            'strings_to_urls': False,
+            'default_date_format': 'yyyy-mm-dd hh:mm:ss'
+        })
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, list(df.columns))
+        
+        column_values = [df[column].tolist() for column in df.columns]
+        for row_idx, row in enumerate(zip(*column_values), start=1):
+            worksheet.write_row(row_idx, 0, row)
+        
+        workbook.close()
     
     print(f"Arquivo gerado com sucesso: {output_file}")
     print(f"Tamanho do arquivo: {os.path.getsize(output_file) / (1024 * 1024):.2f} MB")
     
     return output_file
 
+def _gerar_bloco(num_records, seed, num_placas, data_inicial):
+    """
+    Gera um bloco de registros com um gerador próprio.
+    
+    Roda em um processo separado; as colunas categóricas voltam como códigos para
+    que os blocos possam ser concatenados com np.concatenate.
+    
+    Args:
+        num_records: Número de registros do bloco
+        seed: SeedSequence do bloco (fluxos independentes entre os blocos)
+        num_placas: Número de placas sorteáveis
+        data_inicial: Data base (datetime64) das viagens
+    
+    Returns:
+        dict: Arrays das colunas do bloco
+    """
+    rng = np.random.default_rng(seed)
+    
+    # Gerar as colunas numéricas de uma vez com o gerador do NumPy, em vez de
+    # várias chamadas ao módulo random por registro
+    dias_aleatorios = rng.integers(0, 365, num_records)
+    duracao_horas = rng.uniform(1, 72, num_records)  # Entre 1 hora e 3 dias
+    distancia = rng.uniform(50, 2000, num_records)  # Entre 50 e 2000 km
+    consumo_medio = rng.uniform(2.5, 5.0, num_records)  # Litros por km
+    preco_combustivel = rng.uniform(4.5, 6.5, num_records)  # Preço por litro
+    carga = rng.uniform(500, 25000, num_records)
+    
+    # Colunas derivadas calculadas sobre os arrays inteiros
+    velocidade_media = distancia / duracao_horas
+    consumo_total = distancia * consumo_medio
+    custo_combustivel = consumo_total * preco_combustivel
+    num_paradas = (duracao_horas // 4).astype(np.int64) + rng.integers(0, 4, num_records)
+    tempo_paradas = rng.uniform(0.25, 0.5, num_records) * num_paradas
+    
+    # Sortear índices das colunas categóricas (os códigos viram categorias no final)
+    def sortear(num_opcoes):
+        return rng.integers(0, num_opcoes, num_records)
+    
+    # Destino deslocado de 1 a len(CIDADES) - 1 posições da origem: nunca é igual a ela
+    idx_origem = rng.integers(0, len(CIDADES), num_records)
+    idx_destino = (idx_origem + rng.integers(1, len(CIDADES), num_records)) % len(CIDADES)
+    
+    # Eventos: quantidade por viagem sorteada com pesos e, para cada quantidade,
+    # eventos distintos sorteados para todas as viagens com essa quantidade de uma vez
+    num_eventos = rng.choice(6, size=num_records, p=[0.6, 0.2, 0.1, 0.05, 0.03, 0.02])
+    eventos_arr = np.asarray(EVENTOS, dtype=object)
+    eventos_registrados = np.full(num_records, '', dtype=object)
+    for k in range(1, 6):
+        idx = np.flatnonzero(num_eventos == k)
+        if len(idx) == 0:
+            continue
+        # As k primeiras posições de uma permutação aleatória por linha (sem repetição)
+        escolhidos = np.argsort(rng.random((len(idx), len(EVENTOS))), axis=1)[:, :k]
+        eventos_registrados[idx] = [', '.join(linha) for linha in eventos_arr[escolhidos]]
+    
+    # Scores limitados a 0-100
+    # Quanto menos eventos, melhor o score de segurança
+    score_seguranca = np.clip(100 - num_eventos * 15 + rng.uniform(-5, 5, num_records), 0, 100)
+    # Eficiência baseada em consumo e velocidade
+    score_eficiencia = np.clip(
+        100 - (consumo_medio - 2.5) * 20 + velocidade_media / 10 + rng.uniform(-10, 10, num_records),
+        0, 100
+    )
+    # Score geral
+    score_geral = np.clip(score_seguranca * 0.6 + score_eficiencia * 0.4 + rng.uniform(-5, 5, num_records), 0, 100)
+    
+    # Datas de saída e chegada por aritmética de datetime64 sobre os arrays, sem
+    # criar um datetime/timedelta por registro
+    data_saida = data_inicial + dias_aleatorios.astype('timedelta64[D]')
+    data_chegada = data_saida + (duracao_horas * 3_600_000_000).astype(np.int64).astype('timedelta64[us]')
+    
+    return {
+        'motorista': sortear(len(NOMES)),
+        'data_saida': data_saida,
+        'data_chegada': data_chegada,
+        'origem': idx_origem,
+        'destino': idx_destino,
+        'veiculo': sortear(len(VEICULOS)),
+        'placa': sortear(num_placas),
+        'distancia_km': distancia.astype(np.float32),
+        'tempo_viagem_horas': duracao_horas.astype(np.float32),
+        'consumo_combustivel_litros': consumo_total.astype(np.float32),
+        'custo_combustivel': custo_combustivel.astype(np.float32),
+        'velocidade_media_kmh': velocidade_media.astype(np.float32),
+        'carga_kg': carga.astype(np.float32),
+        'tipo_carga': sortear(len(TIPOS_CARGA)),
+        'eventos_registrados': eventos_registrados,
+        'num_paradas': num_paradas.astype(np.int16),
+        'tempo_paradas_horas': tempo_paradas.astype(np.float32),
+        'score_seguranca': score_seguranca.astype(np.float32),
+        'score_eficiencia': score_eficiencia.astype(np.float32),
+        'score_geral': score_geral.astype(np.float32)
+    }
+
+def _write_parquet(df, output_file):
+    """
+    Grava o DataFrame em Parquet, com o Polars quando disponível.
+    
+    Args:
+        df: DataFrame a ser gravado
+        output_file: Nome do arquivo de saída
+    """
+    if pl is not None:
+        try:
+            # O escritor do Polars codifica e comprime as colunas em paralelo
+            pl.from_pandas(df).write_parquet(output_file, compression='zstd',
+                                             row_group_size=PARQUET_ROW_GROUP_SIZE)
+            return
+        except ImportError:
+            # pl.from_pandas depende do pyarrow (principalmente para as categóricas)
+            print("Aviso: pyarrow não disponível para o Polars; gravando o Parquet com o pandas")
+    
+    # Dicionário aproveita as colunas categóricas; zstd comprime melhor que o snappy
+    df.to_parquet(output_file, compression='zstd', engine='pyarrow', index=False,
+                  row_group_size=PARQUET_ROW_GROUP_SIZE, use_dictionary=True)
+
+def _write_excel_openpyxl(df, output_file):
+    """
+    Grava o DataFrame com o openpyxl em modo write-only.
+    
+    O XML de cada linha é gerado à medida que ela é adicionada, sem manter a planilha
+    inteira em memória.
+    
+    Args:
+        df: DataFrame a ser gravado
+        output_file: Nome do arquivo de saída
+    """
+    import openpyxl
+    
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        print("Aviso: lxml não instalado; o openpyxl grava o XML bem mais devagar sem ele")
+    
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('data')
+    worksheet.append(list(df.columns))
+    
+    column_values = [df[column].tolist() for column in df.columns]
+    for row in zip(*column_values):
+        worksheet.append(row)
+    
+    workbook.save(output_file)
+
 if __name__ == "__main__":
     # Gerar dados de teste com 300 mil registros
     generate_test_data(300000, 'dados_teste_frota_300k.xlsx')
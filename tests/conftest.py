@@ -0,0 +1,18 @@
+"""
+Configuração compartilhada dos testes.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Permitir os imports no formato src.services..., como em src/main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test_data_generator import generate_test_data  # noqa: E402
+
+@pytest.fixture
+def generated_xlsx(tmp_path):
+    """Planilha pequena com o esquema do gerador de dados de teste."""
+    return generate_test_data(200, str(tmp_path / 'dados_teste.xlsx'))
@@ -0,0 +1,33 @@
+"""
+Testes do motor de chat (dados dos relatórios).
+"""
+
+from src.services.data_processor import DataProcessor
+from src.services.chat_engine import ChatEngine
+
+def test_alias_columns_on_generated_schema(generated_xlsx):
+    """Cada chave de COLUMN_ALIASES resolve para a coluna esperada, na ordem dos padrões."""
+    data_processor = DataProcessor()
+    assert data_processor.load_data(generated_xlsx)
+    
+    assert data_processor.get_alias_column('motorista') == 'motorista'
+    assert data_processor.get_alias_column('data') == 'data_saida'
+    assert data_processor.get_alias_column('origem') == 'origem'
+    assert data_processor.get_alias_column('destino') == 'destino'
+    assert data_processor.get_alias_column('distancia') == 'distancia_km'
+    assert data_processor.get_alias_column('tempo') == 'tempo_viagem_horas'
+    assert data_processor.get_alias_column('consumo') == 'consumo_combustivel_litros'
+
+def test_trips_report_columns_on_generated_schema(generated_xlsx):
+    """O relatório de viagens traz origem e destino, sem repetir a data de chegada."""
+    data_processor = DataProcessor()
+    assert data_processor.load_data(generated_xlsx)
+    
+    report_data = ChatEngine(data_processor).generate_report_data('viagens')
+    
+    assert report_data['error'] is None
+    assert report_data['columns'] == [
+        'motorista', 'data_saida', 'origem', 'destino',
+        'distancia_km', 'tempo_viagem_horas', 'consumo_combustivel_litros'
+    ]
+    assert len(report_data['data']) == 200
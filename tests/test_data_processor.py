@@ -0,0 +1,77 @@
+"""
+Testes do processador de dados.
+"""
+
+import pandas as pd
+
+from src.services.data_processor import DataProcessor
+
+def _processor(df):
+    """Cria um processador com o DataFrame já carregado."""
+    data_processor = DataProcessor()
+    data_processor.data = df
+    data_processor.invalidate_caches()
+    data_processor.extract_metadata()
+    return data_processor
+
+def test_filter_equality():
+    """Filtros de igualdade em texto e em números se combinam com E."""
+    data_processor = _processor(pd.DataFrame({
+        'motorista': ['Ana', 'Beto', 'Ana', 'Caio'],
+        'n': [1, 2, 3, 1]
+    }))
+    
+    assert data_processor.filter_data({'motorista': 'Ana'})['n'].tolist() == [1, 3]
+    assert data_processor.filter_data({'n': 1})['motorista'].tolist() == ['Ana', 'Caio']
+    assert data_processor.filter_data({'motorista': 'Ana', 'n': 1}).index.tolist() == [0]
+
+def test_filter_ignores_unknown_columns():
+    """Colunas inexistentes são ignoradas; sem critérios, todas as linhas voltam."""
+    data_processor = _processor(pd.DataFrame({'n': [1, 2, 3]}))
+    
+    assert len(data_processor.filter_data({'outra': 1})) == 3
+
+def test_filter_none_matches_nothing():
+    """None não é igual às células vazias (mesma semântica do Series == None)."""
+    data_processor = _processor(pd.DataFrame({'placa': ['ABC-1234', None, 'XYZ-9876']}))
+    
+    assert data_processor.filter_data({'placa': None}).empty
+
+def test_filter_in_numeric_list():
+    """Uma lista como valor seleciona qualquer um dos itens."""
+    data_processor = _processor(pd.DataFrame({'n': [1, 2, 3, 4]}))
+    
+    assert data_processor.filter_data({'n': [1, 3]})['n'].tolist() == [1, 3]
+    assert data_processor.filter_data({'n': (4,)})['n'].tolist() == [4]
+
+def test_filter_in_mixed_list():
+    """Listas com tipos misturados comparam cada item com seu próprio tipo."""
+    numeric = _processor(pd.DataFrame({'n': [1, 2, 3]}))
+    assert numeric.filter_data({'n': ['1', 2]})['n'].tolist() == [2]
+    
+    mixed = _processor(pd.DataFrame({'codigo': ['1', 2, 'x', 1]}, dtype=object))
+    assert mixed.filter_data({'codigo': ['1', 2]}).index.tolist() == [0, 1]
+
+def test_alias_follows_pattern_priority():
+    """O padrão mais prioritário vence, mesmo que outra coluna venha antes."""
+    data_processor = _processor(pd.DataFrame({
+        'data_chegada': pd.to_datetime(['2024-01-02']),
+        'destino': ['Recife']
+    }))
+    
+    assert data_processor.get_alias_column('destino') == 'destino'
+
+def test_summary_follows_new_load(generated_xlsx, tmp_path):
+    """As estatísticas em cache são descartadas quando outra planilha é carregada."""
+    data_processor = DataProcessor()
+    assert data_processor.load_data(generated_xlsx)
+    first = data_processor.get_summary_stats()
+    first_json = data_processor.get_summary_json()
+    
+    other = tmp_path / 'outra.xlsx'
+    pd.DataFrame({'distancia_km': [10.0, 20.0]}).to_excel(other, index=False)
+    assert data_processor.load_data(str(other))
+    
+    assert data_processor.get_summary_stats() is not first
+    assert data_processor.get_summary_stats()['distancia_km']['mean'] == 15.0
+    assert data_processor.get_summary_json() != first_json
@@ -0,0 +1,35 @@
+"""
+Testes do gerador de relatórios PDF.
+"""
+
+import pandas as pd
+
+from src.services.data_processor import DataProcessor
+from src.services.chat_engine import ChatEngine
+from src.services.pdf_generator import generate_pdf
+
+def test_general_report_renders_to_pdf(tmp_path):
+    """O relatório geral sai do motor de chat e vira um PDF válido."""
+    file_path = tmp_path / 'viagens.xlsx'
+    pd.DataFrame({
+        'motorista': ['João Silva', 'Maria Santos', 'João Silva', 'Ana Costa'],
+        'origem': ['São Paulo', 'Belém', 'Maceió', 'Goiânia'],
+        'distancia_km': [120.5, 300.0, 85.25, 410.75],
+        'score_seguranca': [90, 75, 88, 60]
+    }).to_excel(file_path, index=False)
+    
+    data_processor = DataProcessor()
+    assert data_processor.load_data(str(file_path))
+    
+    report_data = ChatEngine(data_processor).generate_report_data('geral')
+    assert report_data.get('error') is None
+    stats = report_data['data']
+    assert isinstance(stats['metadata']['memory_usage'], float)
+    assert stats['summary']['numeric']
+    
+    # Como na rota de relatórios, o relatório geral recebe o dicionário de estatísticas
+    output_path = tmp_path / 'geral.pdf'
+    generate_pdf(stats, 'geral', str(output_path))
+    
+    with open(output_path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
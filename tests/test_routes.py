@@ -0,0 +1,53 @@
+"""
+Testes das rotas de upload e de resumo dos dados.
+"""
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from src.routes import upload
+from src.routes.chat import chat_bp
+from src.services.data_processor import DataProcessor
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Aplicação mínima com os blueprints de upload e chat."""
+    monkeypatch.setattr(upload, 'UPLOAD_FOLDER', str(tmp_path))
+    
+    app = Flask(__name__)
+    app.config['DATA_PROCESSOR'] = DataProcessor()
+    app.register_blueprint(upload.upload_bp)
+    app.register_blueprint(chat_bp)
+    return app.test_client()
+
+def _upload(client, path):
+    """Envia a planilha como corpo bruto, como no upload por streaming."""
+    with open(path, 'rb') as f:
+        return client.post(
+            '/api/upload?filename=dados.xlsx',
+            data=f.read(),
+            content_type='application/octet-stream'
+        )
+
+def test_summary_etag_changes_after_upload(client, generated_xlsx, tmp_path):
+    """Um novo upload troca o resumo e o ETag; o ETag antigo deixa de valer."""
+    assert _upload(client, generated_xlsx).status_code == 200
+    
+    first = client.get('/api/data/summary')
+    assert first.status_code == 200
+    assert first.json['metadata']['num_rows'] == 200
+    etag = first.headers['ETag']
+    
+    # Mesma versão dos dados: o cliente recebe 304
+    assert client.get('/api/data/summary', headers={'If-None-Match': etag}).status_code == 304
+    
+    other = tmp_path / 'outra.xlsx'
+    pd.DataFrame({'distancia_km': [10.0, 20.0, 30.0]}).to_excel(other, index=False)
+    assert _upload(client, other).status_code == 200
+    
+    second = client.get('/api/data/summary', headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != etag
+    assert second.json['metadata']['num_rows'] == 3
+    assert second.json['summary']['distancia_km']['mean'] == 20.0